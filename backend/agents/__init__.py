@@ -7,5 +7,8 @@ from .routing_agent import RoutingAgent
 from .drafting_agent import DraftingAgent
 from .filing_agent import FilingAgent
 from .appeal_agent import AppealAgent
+from .orchestrator import AgentOrchestrator
+from ._http import aclose as close_http_clients
 
-__all__ = ["QueryAgent", "RoutingAgent", "DraftingAgent", "FilingAgent", "AppealAgent"]
\ No newline at end of file
+__all__ = ["QueryAgent", "RoutingAgent", "DraftingAgent", "FilingAgent", "AppealAgent",
+           "AgentOrchestrator", "close_http_clients"]
\ No newline at end of file
@@ -0,0 +1,80 @@
+"""
+_batcher.py — Micro-batching of concurrent LLM requests
+Items submitted within a short window are handed to a batch handler as one
+list, so N concurrent callers share a single Gemini round-trip.
+"""
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class MicroBatcher:
+    """
+    Collects submitted items for up to `window` seconds (or until
+    `max_batch` are queued) and resolves each caller's future with the
+    matching element of `handler(items)`.
+
+    `handler` is an async callable taking a list of items and returning a
+    list of results of the same length. `single` handles a lone item when
+    nothing else arrived in the window, and is also used to retry items
+    individually if the batch call fails.
+    """
+
+    def __init__(self, handler, single, max_batch: int = 16, window: float = 0.08):
+        self.handler = handler
+        self.single = single
+        self.max_batch = max_batch
+        self.window = window
+        self._queue = None
+        self._worker = None
+        self._inflight = set()
+
+    async def submit(self, item):
+        self._ensure_worker()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((item, future))
+        return await future
+
+    def _ensure_worker(self):
+        loop = asyncio.get_running_loop()
+        if self._worker is None or self._worker.done() or self._worker.get_loop() is not loop:
+            self._queue = asyncio.Queue()
+            self._worker = loop.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            batch = [await self._queue.get()]
+            await asyncio.sleep(self.window)
+            while len(batch) < self.max_batch and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            task = asyncio.create_task(self._dispatch(batch))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+    async def _dispatch(self, batch):
+        items = [item for item, _ in batch]
+        if len(items) == 1:
+            results = [await self._call_single(items[0])]
+        else:
+            try:
+                results = await self.handler(items)
+                if len(results) != len(items):
+                    raise ValueError(f"expected {len(items)} results, got {len(results)}")
+            except Exception as e:
+                logger.warning("batch of %d failed (%s), retrying individually", len(items), e)
+                results = await asyncio.gather(*(self._call_single(item) for item in items))
+
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    async def _call_single(self, item):
+        try:
+            return await self.single(item)
+        except Exception as e:
+            return e
@@ -0,0 +1,29 @@
+"""
+_http.py — Process-wide HTTP connection pools for the LLM SDK clients
+One keep-alive pool (HTTP/2 where the server supports it) per sync/async
+transport is shared by every agent module, so TLS/TCP handshakes are paid
+once per connection rather than per call.
+"""
+import atexit
+
+import httpx
+
+HTTP = httpx.Client(
+    http2=True,
+    timeout=30,
+    limits=httpx.Limits(max_keepalive_connections=32, max_connections=64)
+)
+atexit.register(HTTP.close)
+
+# Used by client.aio, which serves the async endpoints. max_connections caps
+# how many requests a burst can put in flight against the upstream quota.
+HTTP_ASYNC = httpx.AsyncClient(
+    http2=True,
+    timeout=30,
+    limits=httpx.Limits(max_keepalive_connections=50, max_connections=100)
+)
+
+
+async def aclose():
+    """Close the async pool; call from the application's shutdown hook."""
+    await HTTP_ASYNC.aclose()
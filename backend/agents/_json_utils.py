@@ -0,0 +1,102 @@
+"""
+_json_utils.py — Helpers for parsing JSON returned by the LLM
+"""
+import json
+import re
+
+import orjson
+
+_FENCE_OPEN = re.compile(r"^```(?:json)?\s*")
+_FENCE_CLOSE = re.compile(r"\s*```$")
+
+
+def clean_json(raw: str) -> str:
+    """Strip surrounding whitespace and any ```json fences from a model reply."""
+    s = raw.strip()
+    if not s.startswith("```"):
+        return s
+    s = _FENCE_OPEN.sub("", s)
+    if s.endswith("```"):
+        s = _FENCE_CLOSE.sub("", s)
+    return s
+
+
+def loads_json(raw: str):
+    """
+    Clean and parse a model reply with orjson, falling back to the more
+    permissive stdlib parser (NaN, Infinity, huge ints) if orjson rejects it.
+    """
+    cleaned = clean_json(raw)
+    try:
+        return orjson.loads(cleaned)
+    except orjson.JSONDecodeError:
+        return json.loads(cleaned)
+
+
+_WHITESPACE = " \t\r\n"
+_decoder = json.JSONDecoder()
+
+
+def _skip(buf: str, i: int, chars: str) -> int:
+    while i < len(buf) and buf[i] in chars:
+        i += 1
+    return i
+
+
+def _next_member(buf: str, pos: int):
+    """
+    Try to decode the next `"key": value` pair of an object starting at pos.
+    Returns (key, value, end) or None if the buffer doesn't hold a complete
+    member yet. A value is only accepted once the following ',' or '}' has
+    arrived, so a number split across chunks ("0." + "75") is never decoded
+    early.
+    """
+    i = _skip(buf, pos, _WHITESPACE + ",")
+    if i >= len(buf) or buf[i] == "}":
+        return None
+    try:
+        key, i = _decoder.raw_decode(buf, i)
+    except json.JSONDecodeError:
+        return None
+    i = _skip(buf, i, _WHITESPACE)
+    if i >= len(buf):
+        return None
+    if buf[i] != ":":
+        raise json.JSONDecodeError("Expecting ':' delimiter", buf, i)
+    i = _skip(buf, i + 1, _WHITESPACE)
+    try:
+        value, end = _decoder.raw_decode(buf, i)
+    except json.JSONDecodeError:
+        return None
+    after = _skip(buf, end, _WHITESPACE)
+    if after >= len(buf) or buf[after] not in ",}":
+        return None
+    return key, value, end
+
+
+class JsonFieldParser:
+    """
+    Incremental parser for a streamed JSON object. feed() each chunk as it
+    arrives; it returns the (key, value) pairs of the top-level fields that
+    became complete with it. Anything before the opening brace (e.g. a
+    ```json fence) is ignored.
+    """
+
+    def __init__(self):
+        self._buf = ""
+        self._pos = -1
+
+    def feed(self, chunk: str) -> list:
+        self._buf += chunk
+        if self._pos < 0:
+            start = self._buf.find("{")
+            if start < 0:
+                return []
+            self._pos = start + 1
+        fields = []
+        while True:
+            member = _next_member(self._buf, self._pos)
+            if member is None:
+                return fields
+            key, value, self._pos = member
+            fields.append((key, value))
@@ -0,0 +1,272 @@
+"""
+_llm_cache.py — Persistent response cache for deterministic Gemini prompts
+Identical (model, prompt, max_tokens, temperature) requests are served from
+SQLite instead of paying for another API round-trip.
+"""
+import asyncio
+import functools
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import typing
+from pathlib import Path
+
+from dotenv import load_dotenv
+from google import genai
+from google.genai import types
+from pydantic import BaseModel, TypeAdapter
+
+from ._http import HTTP, HTTP_ASYNC
+
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+client = genai.Client(
+    api_key=os.getenv("GEMINI_API_KEY"),
+    http_options=types.HttpOptions(httpx_client=HTTP, httpx_async_client=HTTP_ASYNC)
+)
+MODEL = "models/gemini-2.0-flash-lite-lite"
+
+DATA_DIR = Path(__file__).parent.parent / "data"
+CACHE_PATH = DATA_DIR / "llm_cache.db"
+CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", 7 * 24 * 3600))
+CONTEXT_CACHE_TTL = int(os.getenv("LLM_CONTEXT_CACHE_TTL", 3600))
+
+# sha256(prefix) -> (cached_content name or None, expires_at)
+_context_caches = {}
+_context_lock = threading.Lock()
+# sha256(prefix) -> lock held while that prefix's cache is being created
+_creation_locks = {}
+
+
+# One long-lived connection shared by all threads; sqlite3 objects aren't
+# safe for concurrent use, so every statement runs under _db_lock.
+_conn = None
+_db_lock = threading.Lock()
+
+
+def _init_cache():
+    """Open the cache (WAL mode), create the table and drop expired rows."""
+    global _conn
+    try:
+        conn = sqlite3.connect(CACHE_PATH, timeout=5, check_same_thread=False)
+        with conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            # WAL commits without an fsync per write; a crash can only lose
+            # the newest cache entries, which are regenerated on demand.
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, response TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            conn.execute("DELETE FROM responses WHERE expires_at <= ?", (time.time(),))
+        _conn = conn
+    except sqlite3.Error as e:
+        logger.warning("init error: %s", e)
+
+
+_init_cache()
+
+
+@functools.lru_cache(maxsize=None)
+def _json_schema(tp) -> dict:
+    return TypeAdapter(tp).json_schema()
+
+
+def _key_default(obj):
+    """
+    Pydantic response schemas enter the key as their JSON schema, not their
+    repr, so editing a model's fields invalidates responses in the old shape.
+    """
+    if typing.get_origin(obj) is not None or (isinstance(obj, type) and issubclass(obj, BaseModel)):
+        return _json_schema(obj)
+    return str(obj)
+
+
+def cache_key(prompt: str, max_tokens: int, temperature: float, **config) -> str:
+    """SHA256 over everything that determines the model output."""
+    payload = {
+        "model": MODEL,
+        "prompt": prompt,
+        "max_tokens": max_tokens,
+        "temperature": temperature,
+        **config,
+    }
+    return hashlib.sha256(
+        json.dumps(payload, sort_keys=True, default=_key_default).encode()
+    ).hexdigest()
+
+
+def cache_get(key: str):
+    if _conn is None:
+        return None
+    try:
+        with _db_lock:
+            row = _conn.execute(
+                "SELECT response FROM responses WHERE key = ? AND expires_at > ?",
+                (key, time.time()),
+            ).fetchone()
+        return row[0] if row else None
+    except sqlite3.Error as e:
+        logger.warning("read error: %s", e)
+        return None
+
+
+def cache_put(key: str, response: str):
+    if _conn is None:
+        return
+    try:
+        with _db_lock, _conn:
+            _conn.execute(
+                "INSERT OR REPLACE INTO responses (key, response, expires_at) VALUES (?, ?, ?)",
+                (key, response, time.time() + CACHE_TTL),
+            )
+    except sqlite3.Error as e:
+        logger.warning("write error: %s", e)
+
+
+def _fresh_context_name(digest: str):
+    """(True, name) while the remembered answer for this prefix is valid, else (False, None)."""
+    with _context_lock:
+        name, expires_at = _context_caches.get(digest, (None, 0))
+    if expires_at - 60 > time.time():
+        return True, name
+    return False, None
+
+
+def context_cache_ready(prefix: str) -> bool:
+    """True when context_cache_name(prefix) will answer without a network call."""
+    return _fresh_context_name(hashlib.sha256(prefix.encode()).hexdigest())[0]
+
+
+def context_cache_name(prefix: str):
+    """
+    Return the name of a Gemini CachedContent holding `prefix` as the system
+    instruction, creating or refreshing it when the TTL runs out. Returns None
+    when the server refuses (e.g. prefix below the minimum cacheable size);
+    that answer is remembered for one TTL so we don't retry on every call.
+    """
+    digest = hashlib.sha256(prefix.encode()).hexdigest()
+    fresh, name = _fresh_context_name(digest)
+    if fresh:
+        return name
+
+    # Only callers of the same prefix wait for its creation; the network call
+    # runs outside _context_lock so other prefixes are never held up.
+    with _context_lock:
+        creation_lock = _creation_locks.setdefault(digest, threading.Lock())
+    with creation_lock:
+        fresh, name = _fresh_context_name(digest)
+        if fresh:
+            return name
+        try:
+            cache = client.caches.create(
+                model=MODEL,
+                config=types.CreateCachedContentConfig(
+                    system_instruction=prefix,
+                    ttl=f"{CONTEXT_CACHE_TTL}s"
+                )
+            )
+            name = cache.name
+        except Exception as e:
+            logger.info("context cache unavailable, sending prefix inline: %s", e)
+            name = None
+        with _context_lock:
+            _context_caches[digest] = (name, time.time() + CONTEXT_CACHE_TTL)
+        return name
+
+
+def _generate_config(max_tokens: int, temperature: float, prefix: str,
+                     config: dict) -> types.GenerateContentConfig:
+    if prefix:
+        cached_content = context_cache_name(prefix)
+        if cached_content:
+            config = {**config, "cached_content": cached_content}
+        else:
+            config = {**config, "system_instruction": prefix}
+    return types.GenerateContentConfig(
+        temperature=temperature,
+        max_output_tokens=max_tokens,
+        **config
+    )
+
+
+def cached_generate(prompt: str, max_tokens: int, temperature: float = 0.1,
+                    prefix: str = None, **config) -> str:
+    """
+    Drop-in replacement for client.models.generate_content(...).text.
+    `prefix` is static instruction text shared across calls; it is served
+    from a server-side context cache when possible so only `prompt` is
+    prefilled per request. Extra keyword arguments are forwarded to
+    GenerateContentConfig and are part of the cache key.
+    """
+    key = cache_key(prompt, max_tokens, temperature, prefix=prefix, **config)
+    hit = cache_get(key)
+    if hit is not None:
+        return hit
+
+    response = client.models.generate_content(
+        model=MODEL,
+        contents=prompt,
+        config=_generate_config(max_tokens, temperature, prefix, config)
+    )
+    text = response.text
+    if text:
+        cache_put(key, text)
+    return text
+
+
+async def cached_generate_async(prompt: str, max_tokens: int, temperature: float = 0.1,
+                                prefix: str = None, **config) -> str:
+    """Async variant of cached_generate() using client.aio."""
+    key = cache_key(prompt, max_tokens, temperature, prefix=prefix, **config)
+    # SQLite reads and commits happen in a worker thread, never on the loop.
+    hit = await asyncio.to_thread(cache_get, key)
+    if hit is not None:
+        return hit
+
+    # Creating a context cache is a blocking network call; hop to a thread
+    # only when one actually has to be created.
+    if prefix and not context_cache_ready(prefix):
+        await asyncio.to_thread(context_cache_name, prefix)
+    response = await client.aio.models.generate_content(
+        model=MODEL,
+        contents=prompt,
+        config=_generate_config(max_tokens, temperature, prefix, config)
+    )
+    text = response.text
+    if text:
+        await asyncio.to_thread(cache_put, key, text)
+    return text
+
+
+async def stream_generate_async(prompt: str, max_tokens: int, temperature: float = 0.1,
+                                prefix: str = None, **config):
+    """
+    Streaming counterpart of cached_generate_async(): yields text chunks as
+    they arrive. A cache hit is yielded as a single chunk; a miss is stored
+    once the stream completes.
+    """
+    key = cache_key(prompt, max_tokens, temperature, prefix=prefix, **config)
+    hit = await asyncio.to_thread(cache_get, key)
+    if hit is not None:
+        yield hit
+        return
+
+    if prefix and not context_cache_ready(prefix):
+        await asyncio.to_thread(context_cache_name, prefix)
+    parts = []
+    async for chunk in await client.aio.models.generate_content_stream(
+        model=MODEL,
+        contents=prompt,
+        config=_generate_config(max_tokens, temperature, prefix, config)
+    ):
+        if chunk.text:
+            parts.append(chunk.text)
+            yield chunk.text
+    if parts:
+        await asyncio.to_thread(cache_put, key, "".join(parts))
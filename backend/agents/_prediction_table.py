@@ -0,0 +1,53 @@
+"""
+_prediction_table.py — Precomputed success predictions
+A prediction depends almost entirely on (category, jurisdiction, urgency),
+so canonical answers for that finite cross-product are generated offline by
+scripts/build_prediction_cache.py and served from memory at runtime.
+"""
+import logging
+from pathlib import Path
+
+import orjson
+
+logger = logging.getLogger(__name__)
+
+DATA_DIR = Path(__file__).parent.parent / "data"
+TABLE_PATH = DATA_DIR / "prediction_cache.json"
+
+CATEGORIES = (
+    "road_infrastructure", "food_ration", "electricity", "water", "education",
+    "health", "employment", "housing", "railways", "income_tax",
+    "lpg_petroleum", "postal", "other",
+)
+JURISDICTIONS = ("central", "state")
+URGENCIES = ("low", "medium", "high")
+
+
+def table_key(category, jurisdiction, urgency) -> str:
+    return f"{category or 'other'}|{jurisdiction or 'central'}|{urgency or 'medium'}"
+
+
+def _load() -> dict:
+    """Key -> serialized prediction; each hit is decoded into a fresh dict."""
+    try:
+        with open(TABLE_PATH, "rb") as f:
+            table = orjson.loads(f.read())
+    except FileNotFoundError:
+        return {}
+    except orjson.JSONDecodeError as e:
+        logger.warning("ignoring unreadable %s: %s", TABLE_PATH.name, e)
+        return {}
+    return {key: orjson.dumps(prediction) for key, prediction in table.items()}
+
+
+_TABLE = _load()
+
+
+def lookup(query_analysis: dict, routing_info: dict):
+    """Return the precomputed prediction for this RTI, or None on a miss."""
+    hit = _TABLE.get(table_key(
+        query_analysis.get("category"),
+        routing_info.get("jurisdiction"),
+        query_analysis.get("urgency"),
+    ))
+    return orjson.loads(hit) if hit else None
@@ -0,0 +1,28 @@
+"""
+_prompt_utils.py — Bounds on user-derived text interpolated into prompts
+Keeps a pathological citizen query from inflating prefill cost.
+"""
+import logging
+
+logger = logging.getLogger(__name__)
+
+MAX_FIELD_CHARS = 500
+MAX_LIST_ITEMS = 20
+MAX_ITEM_CHARS = 200
+
+
+def clip(value, n: int = MAX_FIELD_CHARS):
+    """Truncate a string field to n characters; non-strings pass through."""
+    if not isinstance(value, str) or len(value) <= n:
+        return value
+    logger.debug("Clipped prompt field from %d to %d chars", len(value), n)
+    return value[:n]
+
+
+def clip_list(values, k: int = MAX_LIST_ITEMS, n: int = MAX_ITEM_CHARS):
+    """Keep at most k items, each clipped to n characters."""
+    if not isinstance(values, list):
+        return values
+    if len(values) > k:
+        logger.debug("Clipped prompt list from %d to %d items", len(values), k)
+    return [clip(v, n) for v in values[:k]]
@@ -0,0 +1,174 @@
+"""
+_query_cache.py — In-process exact + near-duplicate cache for QueryAgent
+Citizens ask the same question many times with small wording changes. An
+exact hit is keyed by the SHA1 of the normalized question; otherwise a
+question with the same set of content words is looked up in a second index
+and reused. New entries are persisted to SQLite by a background writer so a
+restart doesn't start from a cold cache, without putting disk I/O on the
+event loop.
+"""
+import hashlib
+import logging
+import os
+import queue
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import closing
+from pathlib import Path
+
+import orjson
+
+logger = logging.getLogger(__name__)
+
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", 1024))
+QUERY_CACHE_TTL = int(os.getenv("QUERY_CACHE_TTL", 24 * 3600))
+QUERY_CACHE_PATH = Path(__file__).parent.parent / "data" / "query_cache.db"
+
+_TOKEN = re.compile(r"\w+")
+_STOPWORDS = frozenset(
+    "a an the of in on at to for from by with and or is are was were be been "
+    "my our me i we you your it this that what which when where who why how "
+    "please kindly can could would will should do does did has have had "
+    "about regarding sir madam".split()
+)
+
+
+def normalize(question: str) -> str:
+    return " ".join(_TOKEN.findall(question.lower()))
+
+
+def content_tokens(normalized: str) -> frozenset:
+    return frozenset(t for t in normalized.split() if t not in _STOPWORDS)
+
+
+class _Entry:
+    __slots__ = ("result", "tokens", "expires_at")
+
+    def __init__(self, result, tokens: frozenset, expires_at: float):
+        self.result = result
+        self.tokens = tokens
+        self.expires_at = expires_at
+
+
+class QueryCache:
+    """
+    LRU + TTL cache of analyze() results. A near-duplicate only counts as a
+    hit when both questions use exactly the same set of non-stopword tokens,
+    whatever their case; only wording such as stopwords, word order and
+    repetition may differ. A cached analysis carries question-specific fields
+    (location, time period), so "ration card in kochi, six months" must never
+    answer for "ration card in thrissur, eight months" however similar the
+    rest of the sentence is.
+    """
+
+    def __init__(self, max_entries: int = QUERY_CACHE_SIZE, ttl: int = QUERY_CACHE_TTL,
+                 path=QUERY_CACHE_PATH):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.path = path
+        self._entries = OrderedDict()
+        # content tokens -> key of the most recently used entry with them
+        self._by_tokens = {}
+        self._lock = threading.Lock()
+        self._pending = queue.SimpleQueue()
+        if path:
+            self._load()
+            threading.Thread(target=self._write_loop, name="query-cache-writer",
+                             daemon=True).start()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=5)
+
+    def _load(self):
+        """Create the table, drop expired rows and warm up with the newest entries."""
+        try:
+            with closing(self._connect()) as conn, conn:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS queries ("
+                    "key TEXT PRIMARY KEY, question TEXT NOT NULL, "
+                    "result TEXT NOT NULL, expires_at REAL NOT NULL)"
+                )
+                conn.execute("DELETE FROM queries WHERE expires_at <= ?", (time.time(),))
+                rows = conn.execute(
+                    "SELECT key, question, result, expires_at FROM queries "
+                    "ORDER BY expires_at DESC LIMIT ?", (self.max_entries,)
+                ).fetchall()
+        except sqlite3.Error as e:
+            logger.warning("load error: %s", e)
+            return
+        loaded = 0
+        for key, question, result, expires_at in reversed(rows):
+            try:
+                result = orjson.loads(result)
+            except ValueError as e:
+                # A corrupt row only costs a cache miss; never fail startup on it.
+                logger.warning("skipping cached analysis %s: %s", key, e)
+                continue
+            self._insert(key, _Entry(result, content_tokens(normalize(question)), expires_at))
+            loaded += 1
+        logger.info("loaded %d cached analyses", loaded)
+
+    def get(self, question: str):
+        normalized = normalize(question)
+        key = hashlib.sha1(normalized.encode()).hexdigest()
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                key = self._by_tokens.get(content_tokens(normalized))
+                entry = self._entries.get(key)
+                if entry is not None:
+                    logger.debug("near-duplicate hit for %.80s", question)
+            if entry is None or entry.expires_at <= now:
+                return None
+            self._touch(key, entry)
+            return {**entry.result, "original_question": question}
+
+    def put(self, question: str, result: dict):
+        normalized = normalize(question)
+        key = hashlib.sha1(normalized.encode()).hexdigest()
+        entry = _Entry(result, content_tokens(normalized), time.time() + self.ttl)
+        with self._lock:
+            self._insert(key, entry)
+        if self.path:
+            self._pending.put((key, question, orjson.dumps(result).decode(), entry.expires_at))
+
+    def _touch(self, key: str, entry: _Entry):
+        self._entries.move_to_end(key)
+        if entry.tokens:
+            self._by_tokens[entry.tokens] = key
+
+    def _insert(self, key: str, entry: _Entry):
+        """Add or replace an entry and evict least recently used ones. Caller holds the lock."""
+        self._entries[key] = entry
+        self._touch(key, entry)
+        while len(self._entries) > self.max_entries:
+            # The indexed key is always the most recently used entry with its
+            # tokens, so once it is evicted no other entry has them either.
+            old_key, old = self._entries.popitem(last=False)
+            if self._by_tokens.get(old.tokens) == old_key:
+                del self._by_tokens[old.tokens]
+
+    def _write_loop(self):
+        """
+        Drain queued entries into SQLite, one transaction per burst. Runs on
+        its own thread with its own connection; whatever is still queued at
+        exit is lost, which only costs a cache miss after restart.
+        """
+        conn = self._connect()
+        while True:
+            rows = [self._pending.get()]
+            while True:
+                try:
+                    rows.append(self._pending.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                with conn:
+                    conn.executemany("INSERT OR REPLACE INTO queries VALUES (?, ?, ?, ?)", rows)
+            except sqlite3.Error as e:
+                logger.warning("write error: %s", e)
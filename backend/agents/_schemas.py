@@ -0,0 +1,53 @@
+"""
+_schemas.py — Response schemas passed to Gemini as response_schema
+so structured calls come back as parseable JSON.
+"""
+from pydantic import BaseModel
+
+
+class ExtractedInfo(BaseModel):
+    what_is_needed: str
+    time_period: str
+    location: str
+    specific_issue: str
+
+
+class QueryAnalysis(BaseModel):
+    original_question: str
+    detected_language: str
+    translated_question: str
+    subject: str
+    category: str
+    extracted_info: ExtractedInfo
+    suggested_questions: list[str]
+    urgency: str
+    is_valid_rti: bool
+    invalid_reason: str
+
+
+class Draft(BaseModel):
+    subject: str
+    formal_questions: list[str]
+    full_application_text: str
+    relevant_sections: list[str]
+    estimated_success_probability: float
+    tips: str
+
+
+class PredictionFactors(BaseModel):
+    question_clarity: float
+    department_responsiveness: float
+    information_availability: float
+
+
+class Prediction(BaseModel):
+    success_probability: float
+    factors: PredictionFactors
+    risk_level: str
+    tips: list[str]
+    estimated_response_days: int
+
+
+class DraftAndPrediction(BaseModel):
+    draft: Draft
+    prediction: Prediction
@@ -0,0 +1,17 @@
+"""
+_templates.py — Shared, read-only view of data/rti_templates.json
+Parsed once per process and shared by every agent that needs it.
+"""
+import functools
+from pathlib import Path
+from types import MappingProxyType
+
+import orjson
+
+DATA_DIR = Path(__file__).parent.parent / "data"
+
+
+@functools.lru_cache(maxsize=1)
+def templates() -> MappingProxyType:
+    with open(DATA_DIR / "rti_templates.json", "rb") as f:
+        return MappingProxyType(orjson.loads(f.read()))
@@ -1,135 +1,251 @@
 """
 appeal_agent.py — Agent 5: Follow-up & Appeal Agent
 """
-import json
-import os
-import re
+import logging
+from bisect import bisect_right
 from datetime import datetime
-from pathlib import Path
 
-from dotenv import load_dotenv
-from google import genai
-from google.genai import types
+import orjson
 
-load_dotenv()
-client = genai.Client(api_key=os.getenv("GEMINI_API_KEY"))
-MODEL = "models/gemini-2.0-flash-lite-lite"
+from ._batcher import MicroBatcher
+from ._json_utils import loads_json
+from ._llm_cache import cached_generate, cached_generate_async
+from ._prediction_table import lookup as lookup_prediction
+from ._prompt_utils import clip, clip_list
+from ._schemas import Prediction
+from ._templates import templates
 
-DATA_DIR = Path(__file__).parent.parent / "data"
-with open(DATA_DIR / "rti_templates.json") as f:
-    TEMPLATES = json.load(f)
+logger = logging.getLogger(__name__)
 
+TEMPLATES = templates()
 
-def _clean_json(raw: str) -> str:
-    raw = raw.strip()
-    raw = re.sub(r"^```(?:json)?\s*", "", raw)
-    raw = re.sub(r"\s*```$", "", raw)
-    return raw.strip()
+
+PREDICTION_FIELDS = (
+    "- success_probability: float 0-1\n"
+    "- factors: object with question_clarity, department_responsiveness, "
+    "information_availability (all floats 0-1)\n"
+    "- risk_level: low|medium|high\n"
+    "- tips: array of exactly 2 specific actionable tip strings for this RTI\n"
+    "- estimated_response_days: integer\n"
+)
+
+
+PREDICTION_PREFIX = (
+    "Analyze this RTI application and predict success probability. "
+    "Return ONLY a valid JSON object, no markdown, no code fences.\n\n"
+    "JSON fields:\n"
+    f"{PREDICTION_FIELDS}"
+)
+
+# A prediction object is ~150 tokens; the stop sequences end decoding as
+# soon as the model tries to add anything after the JSON. Temperature 0 keeps
+# the answer a pure function of the prompt, so the response cache always hits.
+PREDICTION_CONFIG = {
+    "max_tokens": 200,
+    "temperature": 0,
+    "prefix": PREDICTION_PREFIX,
+    "response_mime_type": "application/json",
+    "stop_sequences": ["\n\n", "```"],
+}
+
+PREDICTION_BATCH_PREFIX = (
+    "Analyze each of the following RTI applications and predict its success probability. "
+    "Return a JSON array with exactly one object per application, in the same order.\n\n"
+    "Object fields:\n"
+    f"{PREDICTION_FIELDS}"
+)
+
+# Day thresholds for check_and_appeal: below 25 we wait, from 25 we remind,
+# from 30 the PIO is in default and a First Appeal is due.
+RESPONSE_DAYS = 30
+APPEAL_THRESHOLDS = (25, RESPONSE_DAYS)
+WAITING, REMINDER, FIRST_APPEAL = range(3)
+
+FIRST_APPEAL_PREFIX = (
+    "Generate a First Appeal letter under Section 19(1) of RTI Act 2005. "
+    "Return plain text only, no markdown.\n"
+    "No response was received within 30 days. "
+    "Cite Section 19(1), Section 7(1), and Section 18(1)(b)."
+)
+
+
+def _prediction_context(query_analysis: dict, routing_info: dict) -> str:
+    questions = clip_list(query_analysis.get("suggested_questions", []))
+    return (
+        f"Category: {clip(query_analysis.get('category'))}\n"
+        f"Subject: {clip(query_analysis.get('subject'))}\n"
+        f"Urgency: {clip(query_analysis.get('urgency'))}\n"
+        f"Jurisdiction: {routing_info.get('jurisdiction', 'central')}\n"
+        f"Department: {routing_info.get('department')}\n"
+        f"Issue: {clip(query_analysis.get('extracted_info', {}).get('specific_issue', ''))}\n"
+        f"Questions: {orjson.dumps(questions).decode()}"
+    )
+
+
+def _first_appeal_prompt(rti_record: dict) -> str:
+    return (
+        f"Reference Number: {rti_record.get('ref_number')}\n"
+        f"Filed Date: {rti_record.get('filed_at', '')[:10]}\n"
+        f"Department: {rti_record.get('department')}\n"
+        f"Subject: {rti_record.get('subject')}\n"
+        f"Applicant: {rti_record.get('applicant_name')}"
+    )
+
+
+def _first_appeal_from_template(rti_record: dict, now: datetime) -> str:
+    tmpl = TEMPLATES["first_appeal_template"]["body"]
+    return tmpl.format(
+        department_name=rti_record.get("department", "Concerned Department"),
+        department_address="India",
+        applicant_name=rti_record.get("applicant_name", "Applicant"),
+        rti_date=rti_record.get("filed_at", "")[:10],
+        ref_number=rti_record.get("ref_number", ""),
+        subject=rti_record.get("subject", "the matter"),
+        appeal_date=now.strftime("%d %B %Y"),
+        applicant_address=rti_record.get("applicant_address") or ""
+    )
+
+
+def _fallback_prediction() -> dict:
+    return {
+        "success_probability": 0.78,
+        "factors": {
+            "question_clarity": 0.82,
+            "department_responsiveness": 0.74,
+            "information_availability": 0.80
+        },
+        "risk_level": "low",
+        "tips": ["Be specific about dates", "Include specific document names"],
+        "estimated_response_days": 22
+    }
 
 
 class AppealAgent:
+    def __init__(self):
+        self._prediction_batcher = MicroBatcher(self._predict_batch, self._predict_one)
+
     def check_and_appeal(self, rti_record: dict) -> dict:
-        filed_date = datetime.fromisoformat(
-            rti_record.get("filed_at", datetime.now().isoformat())
-        )
-        days_elapsed = (datetime.now() - filed_date).days
-        status = rti_record.get("status", "filed")
+        return self._appeal_action(rti_record, datetime.now())
 
-        if status == "response_received":
+    def check_and_appeal_batch(self, records: list) -> list:
+        """
+        check_and_appeal() over many records (e.g. a nightly sweep), reading
+        the clock once so every record is judged against the same instant.
+        """
+        now = datetime.now()
+        return [self._appeal_action(r, now) for r in records]
+
+    def _appeal_action(self, rti_record: dict, now: datetime) -> dict:
+        if rti_record.get("status", "filed") == "response_received":
             return {"action": "none", "message": "RTI already responded to."}
-        if days_elapsed >= 30 and not rti_record.get("appeal_filed"):
-            appeal = self.generate_first_appeal(rti_record)
+
+        filed_at = rti_record.get("filed_at")
+        filed_date = datetime.fromisoformat(filed_at) if filed_at else now
+        days_elapsed = (now - filed_date).days
+        days_remaining = RESPONSE_DAYS - days_elapsed
+
+        bucket = bisect_right(APPEAL_THRESHOLDS, days_elapsed)
+        if bucket == FIRST_APPEAL and not rti_record.get("appeal_filed"):
             return {
                 "action": "first_appeal",
                 "days_elapsed": days_elapsed,
-                "appeal_draft": appeal,
+                "appeal_draft": self.generate_first_appeal(rti_record, now),
                 "message": "30 days have passed. First Appeal generated automatically."
             }
-        elif days_elapsed >= 25:
+        if bucket >= REMINDER:
             return {
                 "action": "reminder",
                 "days_elapsed": days_elapsed,
-                "days_remaining": 30 - days_elapsed,
-                "message": f"Reminder: {30 - days_elapsed} days remaining for PIO response."
-            }
-        else:
-            return {
-                "action": "waiting",
-                "days_elapsed": days_elapsed,
-                "days_remaining": 30 - days_elapsed,
-                "message": f"Waiting for response. {30 - days_elapsed} days remaining."
+                "days_remaining": days_remaining,
+                "message": f"Reminder: {days_remaining} days remaining for PIO response."
             }
+        return {
+            "action": "waiting",
+            "days_elapsed": days_elapsed,
+            "days_remaining": days_remaining,
+            "message": f"Waiting for response. {days_remaining} days remaining."
+        }
 
-    def generate_first_appeal(self, rti_record: dict) -> str:
+    def generate_first_appeal(self, rti_record: dict, now: datetime = None,
+                              use_llm: bool = False) -> str:
+        """
+        The appeal's sections, dates and reference number are all fixed, so the
+        template is the default. Pass use_llm=True only when reworded prose is
+        wanted; the template remains the fallback if that call fails.
+        """
+        now = now or datetime.now()
+        if not use_llm:
+            return _first_appeal_from_template(rti_record, now)
         try:
-            prompt = (
-                "Generate a First Appeal letter under Section 19(1) of RTI Act 2005. "
-                "Return plain text only, no markdown.\n\n"
-                f"Reference Number: {rti_record.get('ref_number')}\n"
-                f"Filed Date: {rti_record.get('filed_at', '')[:10]}\n"
-                f"Department: {rti_record.get('department')}\n"
-                f"Subject: {rti_record.get('subject')}\n"
-                f"Applicant: {rti_record.get('applicant_name')}\n\n"
-                "No response received within 30 days. "
-                "Cite Section 19(1), Section 7(1), and Section 18(1)(b)."
-            )
-            response = client.models.generate_content(
-                model=MODEL,
-                contents=prompt,
-                config=types.GenerateContentConfig(temperature=0.1, max_output_tokens=800)
-            )
-            return response.text.strip()
+            return cached_generate(
+                _first_appeal_prompt(rti_record), max_tokens=800, temperature=0.1,
+                prefix=FIRST_APPEAL_PREFIX
+            ).strip()
         except Exception as e:
-            print(f"[AppealAgent] generate_first_appeal error: {e}")
-            tmpl = TEMPLATES["first_appeal_template"]["body"]
-            return tmpl.format(
-                department_name=rti_record.get("department", "Concerned Department"),
-                department_address="India",
-                applicant_name=rti_record.get("applicant_name", "Applicant"),
-                rti_date=rti_record.get("filed_at", "")[:10],
-                ref_number=rti_record.get("ref_number", ""),
-                subject=rti_record.get("subject", "the matter"),
-                appeal_date=datetime.now().strftime("%d %B %Y")
+            logger.warning("generate_first_appeal error: %s", e)
+            return _first_appeal_from_template(rti_record, now)
+
+    async def generate_first_appeal_async(self, rti_record: dict, now: datetime = None,
+                                          use_llm: bool = False) -> str:
+        now = now or datetime.now()
+        if not use_llm:
+            return _first_appeal_from_template(rti_record, now)
+        try:
+            raw = await cached_generate_async(
+                _first_appeal_prompt(rti_record), max_tokens=800, temperature=0.1,
+                prefix=FIRST_APPEAL_PREFIX
             )
+            return raw.strip()
+        except Exception as e:
+            logger.warning("generate_first_appeal error: %s", e)
+            return _first_appeal_from_template(rti_record, now)
 
     def predict_success(self, query_analysis: dict, routing_info: dict) -> dict:
+        cached = lookup_prediction(query_analysis, routing_info)
+        if cached is not None:
+            return cached
         try:
-            prompt = (
-                "Analyze this RTI application and predict success probability. "
-                "Return ONLY a valid JSON object, no markdown, no code fences.\n\n"
-                "JSON fields:\n"
-                "- success_probability: float 0-1\n"
-                "- factors: object with question_clarity, department_responsiveness, "
-                "information_availability (all floats 0-1)\n"
-                "- risk_level: low|medium|high\n"
-                "- tips: array of exactly 2 specific actionable tip strings for this RTI\n"
-                "- estimated_response_days: integer\n\n"
-                f"Category: {query_analysis.get('category')}\n"
-                f"Subject: {query_analysis.get('subject')}\n"
-                f"Urgency: {query_analysis.get('urgency')}\n"
-                f"Jurisdiction: {routing_info.get('jurisdiction', 'central')}\n"
-                f"Department: {routing_info.get('department')}\n"
-                f"Issue: {query_analysis.get('extracted_info', {}).get('specific_issue', '')}\n"
-                f"Questions: {json.dumps(query_analysis.get('suggested_questions', []))}"
-            )
-            response = client.models.generate_content(
-                model=MODEL,
-                contents=prompt,
-                config=types.GenerateContentConfig(temperature=0.1, max_output_tokens=400)
-            )
-            raw = response.text
-            print(f"[AppealAgent] predict_success raw: {raw[:200]}")
-            return json.loads(_clean_json(raw))
+            prompt = _prediction_context(query_analysis, routing_info)
+            raw = cached_generate(prompt, **PREDICTION_CONFIG)
+            logger.debug("predict_success raw: %.200s", raw)
+            return loads_json(raw)
         except Exception as e:
-            print(f"[AppealAgent] predict_success error: {e}")
-            return {
-                "success_probability": 0.78,
-                "factors": {
-                    "question_clarity": 0.82,
-                    "department_responsiveness": 0.74,
-                    "information_availability": 0.80
-                },
-                "risk_level": "low",
-                "tips": ["Be specific about dates", "Include specific document names"],
-                "estimated_response_days": 22
-            }            
\ No newline at end of file
+            logger.warning("predict_success error: %s", e)
+            return _fallback_prediction()
+
+    async def predict_success_async(self, query_analysis: dict, routing_info: dict) -> dict:
+        """
+        Concurrent callers are coalesced by the micro-batcher into a single
+        Gemini request; a lone caller takes the single-item path.
+        """
+        cached = lookup_prediction(query_analysis, routing_info)
+        if cached is not None:
+            return cached
+        try:
+            return await self._prediction_batcher.submit((query_analysis, routing_info))
+        except Exception as e:
+            logger.warning("predict_success error: %s", e)
+            return _fallback_prediction()
+
+    async def _predict_one(self, item: tuple) -> dict:
+        query_analysis, routing_info = item
+        prompt = _prediction_context(query_analysis, routing_info)
+        raw = await cached_generate_async(prompt, **PREDICTION_CONFIG)
+        logger.debug("predict_success raw: %.200s", raw)
+        return loads_json(raw)
+
+    async def _predict_batch(self, items: list) -> list:
+        prompt = "\n\n".join(
+            f"APPLICATION {i}:\n{_prediction_context(qa, ri)}"
+            for i, (qa, ri) in enumerate(items, 1)
+        )
+        raw = await cached_generate_async(
+            prompt,
+            max_tokens=PREDICTION_CONFIG["max_tokens"] * len(items),
+            temperature=PREDICTION_CONFIG["temperature"],
+            prefix=PREDICTION_BATCH_PREFIX,
+            response_mime_type="application/json",
+            response_schema=list[Prediction]
+        )
+        logger.debug("predict_success batch of %d raw: %.200s", len(items), raw)
+        return loads_json(raw)
@@ -1,118 +1,194 @@
 """
 drafting_agent.py — Agent 3: RTI Drafting Agent
 """
-import json
-import os
-import re
+import logging
 from datetime import datetime, timedelta
-from pathlib import Path
 
-from dotenv import load_dotenv
-from google import genai
-from google.genai import types
+from ._json_utils import JsonFieldParser, loads_json
+from ._llm_cache import cached_generate, cached_generate_async, stream_generate_async
+from ._prompt_utils import clip
+from ._templates import templates
 
-load_dotenv()
-client = genai.Client(api_key=os.getenv("GEMINI_API_KEY"))
-MODEL = "models/gemini-2.0-flash-lite-lite"
+logger = logging.getLogger(__name__)
 
-DATA_DIR = Path(__file__).parent.parent / "data"
-with open(DATA_DIR / "rti_templates.json") as f:
-    TEMPLATES = json.load(f)
+TEMPLATES = templates()
 
 
-def _clean_json(raw: str) -> str:
-    raw = raw.strip()
-    raw = re.sub(r"^```(?:json)?\s*", "", raw)
-    raw = re.sub(r"\s*```$", "", raw)
-    return raw.strip()
+DRAFT_FIELDS = (
+    "- subject: formal subject line under 100 chars, specific to the issue\n"
+    "- formal_questions: array of exactly 5 RTI questions — each must be a complete formal "
+    "legal sentence specific to the citizen's actual issue. Include dates, locations, "
+    "document names. Never write generic questions.\n"
+    "- full_application_text: complete RTI letter as plain text (see format below)\n"
+    "- relevant_sections: array of applicable RTI/other Act sections\n"
+    "- estimated_success_probability: float 0.0-1.0\n"
+    "- tips: one specific actionable tip for this particular RTI\n"
+)
+
+DRAFT_FORMAT = (
+    "full_application_text FORMAT (plain text, no JSON inside):\n"
+    "To,\n"
+    "The Public Information Officer,\n"
+    "[Department Name],\n"
+    "[Address]\n\n"
+    "Subject: [specific subject]\n\n"
+    "Sir/Madam,\n\n"
+    "I, [Name], a citizen of India residing at [Address], hereby submit this application "
+    "under Section 6(1) of the Right to Information Act, 2005 to seek the following "
+    "information from your office:\n\n"
+    "[Numbered questions — specific, formal, legal language]\n\n"
+    "[Fee clause]\n\n"
+    "I request that the above information be furnished within 30 days as mandated under "
+    "Section 7(1) of the RTI Act, 2005. Should the information not pertain to your "
+    "office, kindly transfer this application to the concerned authority under Section "
+    "6(3) of the RTI Act, 2005.\n\n"
+    "I hereby declare that I am a citizen of India.\n\n"
+    "Yours faithfully,\n"
+    "[Name]\n"
+    "Date: [Date]\n"
+    "Mobile: [Mobile]\n"
+    "Email: [Email]"
+)
+
+
+DRAFT_PREFIX = (
+    "You are a senior legal expert specializing in RTI Act 2005, India.\n"
+    "Draft a complete, formal RTI application and return ONLY a valid JSON object.\n"
+    "NO markdown, NO code fences, NO extra text.\n\n"
+    "JSON fields:\n"
+    f"{DRAFT_FIELDS}\n"
+    f"{DRAFT_FORMAT}"
+)
+
+# Five questions plus a one-page letter fit comfortably in 1,600 output
+# tokens; the stop sequence cuts off any trailing code fence.
+DRAFT_CONFIG = {
+    "max_tokens": 1600,
+    "temperature": 0.1,
+    "prefix": DRAFT_PREFIX,
+    "response_mime_type": "application/json",
+    "stop_sequences": ["\n```"],
+}
+
+
+# Only the per-RTI fields below change between calls; everything static
+# lives in DRAFT_PREFIX.
+DRAFT_CONTEXT_FMT = (
+    "CITIZEN ISSUE: {original_question}\n"
+    "SUBJECT: {subject}\n"
+    "CATEGORY: {category}\n"
+    "LOCATION: {location}\n"
+    "TIME PERIOD: {time_period}\n"
+    "SPECIFIC ISSUE: {specific_issue}\n\n"
+    "DEPARTMENT: {department}\n"
+    "PIO NAME: {pio_name}\n"
+    "PIO ADDRESS: {pio_address}\n\n"
+    "APPLICANT NAME: {name}\n"
+    "APPLICANT ADDRESS: {address}\n"
+    "MOBILE: {mobile}\n"
+    "EMAIL: {email}\n"
+    "DATE: {date}\n"
+    "FEE CLAUSE: {fee_clause}\n"
+)
+
+BPL_FEE_CLAUSE = (
+    "I am a BPL cardholder and am exempt from the application fee under Section 7(5) "
+    "of the RTI Act, 2005."
+)
+FEE_CLAUSE = "I am enclosing the application fee of Rs. 10/- as required under the RTI Act, 2005."
+
+
+def _draft_context(query_analysis: dict, routing_info: dict, applicant: dict, today: datetime) -> str:
+    pio = routing_info.get("pio", {})
+    info = query_analysis.get("extracted_info", {})
+    return DRAFT_CONTEXT_FMT.format_map({
+        "original_question": clip(query_analysis.get("original_question")),
+        "subject": clip(query_analysis.get("subject")),
+        "category": clip(query_analysis.get("category")),
+        "location": clip(info.get("location", "Not specified")),
+        "time_period": clip(info.get("time_period", "as mentioned")),
+        "specific_issue": clip(info.get("specific_issue", "")),
+        "department": pio.get("department"),
+        "pio_name": pio.get("pio_name"),
+        "pio_address": pio.get("address"),
+        "name": applicant.get("name"),
+        "address": applicant.get("address"),
+        "mobile": applicant.get("mobile"),
+        "email": applicant.get("email"),
+        "date": today.strftime("%d %B %Y"),
+        "fee_clause": BPL_FEE_CLAUSE if applicant.get("is_bpl") else FEE_CLAUSE,
+    })
+
+
+def _stamp_dates(draft: dict, today: datetime) -> dict:
+    draft["filed_date"] = today.strftime("%d/%m/%Y")
+    draft["deadline_date"] = (today + timedelta(days=30)).strftime("%d/%m/%Y")
+    return draft
 
 
 class DraftingAgent:
     def draft(self, query_analysis: dict, routing_info: dict, applicant: dict) -> dict:
-        pio = routing_info.get("pio", {})
         today = datetime.now()
         deadline = today + timedelta(days=30)
+        prompt = _draft_context(query_analysis, routing_info, applicant, today)
 
-        fee_clause = (
-            "I am a BPL cardholder and am exempt from the application fee under Section 7(5) of the RTI Act, 2005."
-            if applicant.get("is_bpl")
-            else "I am enclosing the application fee of Rs. 10/- as required under the RTI Act, 2005."
-        )
+        try:
+            raw = cached_generate(prompt, **DRAFT_CONFIG)
+            logger.debug("Raw response: %.300s", raw)
+            result = _stamp_dates(loads_json(raw), today)
+            logger.info("Subject: %s", result.get("subject"))
+            return result
 
-        prompt = (
-            "You are a senior legal expert specializing in RTI Act 2005, India.\n"
-            "Draft a complete, formal RTI application and return ONLY a valid JSON object.\n"
-            "NO markdown, NO code fences, NO extra text.\n\n"
-            "JSON fields:\n"
-            "- subject: formal subject line under 100 chars, specific to the issue\n"
-            "- formal_questions: array of exactly 5 RTI questions — each must be a complete formal "
-            "legal sentence specific to the citizen's actual issue. Include dates, locations, "
-            "document names. Never write generic questions.\n"
-            "- full_application_text: complete RTI letter as plain text (see format below)\n"
-            "- relevant_sections: array of applicable RTI/other Act sections\n"
-            "- estimated_success_probability: float 0.0-1.0\n"
-            "- tips: one specific actionable tip for this particular RTI\n\n"
-            f"CITIZEN ISSUE: {query_analysis.get('original_question')}\n"
-            f"SUBJECT: {query_analysis.get('subject')}\n"
-            f"CATEGORY: {query_analysis.get('category')}\n"
-            f"LOCATION: {query_analysis.get('extracted_info', {}).get('location', 'Not specified')}\n"
-            f"TIME PERIOD: {query_analysis.get('extracted_info', {}).get('time_period', 'as mentioned')}\n"
-            f"SPECIFIC ISSUE: {query_analysis.get('extracted_info', {}).get('specific_issue', '')}\n\n"
-            f"DEPARTMENT: {pio.get('department')}\n"
-            f"PIO NAME: {pio.get('pio_name')}\n"
-            f"PIO ADDRESS: {pio.get('address')}\n\n"
-            f"APPLICANT NAME: {applicant.get('name')}\n"
-            f"APPLICANT ADDRESS: {applicant.get('address')}\n"
-            f"MOBILE: {applicant.get('mobile')}\n"
-            f"EMAIL: {applicant.get('email')}\n"
-            f"DATE: {today.strftime('%d %B %Y')}\n"
-            f"FEE CLAUSE: {fee_clause}\n\n"
-            "full_application_text FORMAT (plain text, no JSON inside):\n"
-            "To,\n"
-            "The Public Information Officer,\n"
-            "[Department Name],\n"
-            "[Address]\n\n"
-            "Subject: [specific subject]\n\n"
-            "Sir/Madam,\n\n"
-            "I, [Name], a citizen of India residing at [Address], hereby submit this application "
-            "under Section 6(1) of the Right to Information Act, 2005 to seek the following "
-            "information from your office:\n\n"
-            "[Numbered questions — specific, formal, legal language]\n\n"
-            "[Fee clause]\n\n"
-            "I request that the above information be furnished within 30 days as mandated under "
-            "Section 7(1) of the RTI Act, 2005. Should the information not pertain to your "
-            "office, kindly transfer this application to the concerned authority under Section "
-            "6(3) of the RTI Act, 2005.\n\n"
-            "I hereby declare that I am a citizen of India.\n\n"
-            "Yours faithfully,\n"
-            "[Name]\n"
-            "Date: [Date]\n"
-            "Mobile: [Mobile]\n"
-            "Email: [Email]"
-        )
+        except Exception as e:
+            logger.warning("Error: %s, using fallback", e)
+            return self._fallback_draft(query_analysis, routing_info, applicant, today, deadline)
+
+    async def draft_async(self, query_analysis: dict, routing_info: dict, applicant: dict) -> dict:
+        today = datetime.now()
+        deadline = today + timedelta(days=30)
+        prompt = _draft_context(query_analysis, routing_info, applicant, today)
 
         try:
-            response = client.models.generate_content(
-                model=MODEL,
-                contents=prompt,
-                config=types.GenerateContentConfig(
-                    temperature=0.1,
-                    max_output_tokens=2500
-                )
-            )
-            raw = response.text
-            print(f"[DraftingAgent] Raw response: {raw[:300]}...")
-            cleaned = _clean_json(raw)
-            result = json.loads(cleaned)
-            result["filed_date"] = today.strftime("%d/%m/%Y")
-            result["deadline_date"] = deadline.strftime("%d/%m/%Y")
-            print(f"[DraftingAgent] Subject: {result.get('subject')}")
+            raw = await cached_generate_async(prompt, **DRAFT_CONFIG)
+            logger.debug("Raw response: %.300s", raw)
+            result = _stamp_dates(loads_json(raw), today)
+            logger.info("Subject: %s", result.get("subject"))
             return result
 
         except Exception as e:
-            print(f"[DraftingAgent] Error: {e}, using fallback")
+            logger.warning("Error: %s, using fallback", e)
             return self._fallback_draft(query_analysis, routing_info, applicant, today, deadline)
 
+    async def draft_stream(self, query_analysis: dict, routing_info: dict, applicant: dict):
+        """
+        Stream the draft from Gemini, yielding (field, value) as soon as each
+        top-level field (subject, formal_questions, ...) is complete, so the
+        client can show them before the full letter arrives. If the stream
+        fails or ends without a letter, the fallback draft's fields follow
+        and replace whatever was sent.
+        """
+        today = datetime.now()
+        deadline = today + timedelta(days=30)
+        prompt = _draft_context(query_analysis, routing_info, applicant, today)
+        parser = JsonFieldParser()
+        seen = set()
+
+        try:
+            async for chunk in stream_generate_async(prompt, **DRAFT_CONFIG):
+                for key, value in parser.feed(chunk):
+                    seen.add(key)
+                    yield key, value
+            if "full_application_text" not in seen:
+                raise ValueError(f"incomplete draft, got fields {sorted(seen)}")
+            for key, value in _stamp_dates({}, today).items():
+                yield key, value
+
+        except Exception as e:
+            logger.warning("Error: %s, using fallback", e)
+            for key, value in self._fallback_draft(query_analysis, routing_info, applicant,
+                                                   today, deadline).items():
+                yield key, value
+
     def _fallback_draft(self, qa, ri, applicant, today, deadline) -> dict:
         pio = ri.get("pio", {})
         questions = qa.get("suggested_questions", [])
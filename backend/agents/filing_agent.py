@@ -4,8 +4,9 @@ Simulates RTI portal submission and manages tracking.
 In production: integrate with rtionline.gov.in API / Selenium automation.
 """
 import random
-import string
+import zlib
 from datetime import datetime, timedelta
+from typing import ClassVar
 
 
 class FilingAgent:
@@ -15,6 +16,13 @@ class FilingAgent:
     Output: Reference number, acknowledgment, tracking status
     """
 
+    _STATUSES: ClassVar[tuple] = (
+        {"status": "filed", "message": "RTI filed and dispatched to PIO", "progress": 20},
+        {"status": "acknowledged", "message": "Acknowledged by PIO office", "progress": 40},
+        {"status": "under_process", "message": "Being processed by the department", "progress": 60},
+        {"status": "response_ready", "message": "Response being prepared", "progress": 80},
+    )
+
     def file(self, draft: dict, routing_info: dict, ref_number: str) -> dict:
         """
         Simulate filing the RTI on government portal.
@@ -32,8 +40,8 @@ class FilingAgent:
         dept = routing_info.get("department", "Government Department")
 
         # Simulate acknowledgment number (real: capture from portal response)
-        ack_no = self._generate_ack_number()
         filing_date = datetime.now()
+        ack_no = self._generate_ack_number(filing_date)
         deadline = filing_date + timedelta(days=30)
 
         return {
@@ -57,17 +65,12 @@ class FilingAgent:
         In production: poll the government portal API.
         For demo: return simulated status.
         """
-        # Simulate different statuses for demo
-        statuses = [
-            {"status": "filed", "message": "RTI filed and dispatched to PIO", "progress": 20},
-            {"status": "acknowledged", "message": "Acknowledged by PIO office", "progress": 40},
-            {"status": "under_process", "message": "Being processed by the department", "progress": 60},
-            {"status": "response_ready", "message": "Response being prepared", "progress": 80},
-        ]
-        return random.choice(statuses)
+        # Simulated status: a stable bucket per ref number, so repeated
+        # polls of the same RTI show the same stage in the demo.
+        return dict(self._STATUSES[zlib.crc32(ref_number.encode()) & 3])
 
-    def _generate_ack_number(self) -> str:
+    def _generate_ack_number(self, now: datetime) -> str:
         """Generate a realistic acknowledgment number."""
-        year = datetime.now().year
-        num = ''.join(random.choices(string.digits, k=8))
+        year = now.year
+        num = f"{random.randrange(100_000_000):08d}"
         return f"DOPT{year}{num}"
\ No newline at end of file
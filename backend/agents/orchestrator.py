@@ -0,0 +1,107 @@
+"""
+orchestrator.py — Runs the drafting and prediction steps of the pipeline
+as a single structured Gemini call instead of one call per agent.
+"""
+import asyncio
+import logging
+from datetime import datetime
+
+from ._json_utils import loads_json
+from ._llm_cache import cached_generate, cached_generate_async
+from ._prediction_table import lookup as lookup_prediction
+from ._schemas import DraftAndPrediction
+from .appeal_agent import PREDICTION_CONFIG, PREDICTION_FIELDS, AppealAgent
+from .drafting_agent import (DRAFT_CONFIG, DRAFT_FIELDS, DRAFT_FORMAT,
+                             DraftingAgent, _draft_context, _stamp_dates)
+
+logger = logging.getLogger(__name__)
+
+
+COMBINED_PREFIX = (
+    "You are a senior legal expert specializing in RTI Act 2005, India.\n"
+    "Draft a complete, formal RTI application and predict its success probability.\n"
+    "Return a JSON object with two keys: \"draft\" and \"prediction\".\n\n"
+    "draft fields:\n"
+    f"{DRAFT_FIELDS}\n"
+    "prediction fields:\n"
+    f"{PREDICTION_FIELDS}\n"
+    f"{DRAFT_FORMAT}"
+)
+
+
+COMBINED_CONFIG = {
+    "max_tokens": DRAFT_CONFIG["max_tokens"] + PREDICTION_CONFIG["max_tokens"],
+    "temperature": 0.1,
+    "prefix": COMBINED_PREFIX,
+    "response_mime_type": "application/json",
+    "response_schema": DraftAndPrediction,
+}
+
+
+def _combined_prompt(query_analysis: dict, routing_info: dict, applicant: dict,
+                     today: datetime) -> str:
+    return (
+        f"{_draft_context(query_analysis, routing_info, applicant, today)}"
+        f"URGENCY: {query_analysis.get('urgency')}\n"
+        f"JURISDICTION: {routing_info.get('jurisdiction', 'central')}"
+    )
+
+
+def _split_combined(raw: str, today: datetime) -> dict:
+    combined = loads_json(raw)
+    draft = _stamp_dates(combined["draft"], today)
+    logger.info("Subject: %s", draft.get("subject"))
+    return {"draft": draft, "prediction": combined["prediction"]}
+
+
+class AgentOrchestrator:
+    """
+    Fuses Agent 3 (drafting) and Agent 5 (success prediction) into one
+    round-trip. Falls back to the individual agents if the combined call fails.
+    """
+
+    def __init__(self, drafting_agent: DraftingAgent, appeal_agent: AppealAgent):
+        self.drafting_agent = drafting_agent
+        self.appeal_agent = appeal_agent
+
+    def generate_all(self, query_analysis: dict, routing_info: dict, applicant: dict) -> dict:
+        prediction = lookup_prediction(query_analysis, routing_info)
+        if prediction is not None:
+            draft = self.drafting_agent.draft(query_analysis, routing_info, applicant)
+            return {"draft": draft, "prediction": prediction}
+
+        today = datetime.now()
+        prompt = _combined_prompt(query_analysis, routing_info, applicant, today)
+
+        try:
+            raw = cached_generate(prompt, **COMBINED_CONFIG)
+            return _split_combined(raw, today)
+
+        except Exception as e:
+            logger.warning("Combined call failed: %s, using per-agent calls", e)
+            return {
+                "draft": self.drafting_agent.draft(query_analysis, routing_info, applicant),
+                "prediction": self.appeal_agent.predict_success(query_analysis, routing_info)
+            }
+
+    async def generate_all_async(self, query_analysis: dict, routing_info: dict,
+                                 applicant: dict) -> dict:
+        prediction = lookup_prediction(query_analysis, routing_info)
+        if prediction is not None:
+            draft = await self.drafting_agent.draft_async(query_analysis, routing_info, applicant)
+            return {"draft": draft, "prediction": prediction}
+
+        today = datetime.now()
+        prompt = _combined_prompt(query_analysis, routing_info, applicant, today)
+
+        try:
+            raw = await cached_generate_async(prompt, **COMBINED_CONFIG)
+            return _split_combined(raw, today)
+
+        except Exception as e:
+            logger.warning("Combined call failed: %s, using per-agent calls", e)
+            draft, prediction = await asyncio.gather(
+                self.drafting_agent.draft_async(query_analysis, routing_info, applicant),
+                self.appeal_agent.predict_success_async(query_analysis, routing_info)
+            )
+            return {"draft": draft, "prediction": prediction}
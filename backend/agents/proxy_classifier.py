@@ -0,0 +1,67 @@
+"""
+proxy_classifier.py — Cheap local category/language guess for QueryAgent
+Keyword patterns from departments.json decide the category; when one
+category clearly dominates, QueryAgent answers locally instead of calling
+Gemini. Ambiguous or non-English questions report low confidence.
+"""
+import os
+import re
+
+from .routing_agent import DEPARTMENTS
+
+CONFIDENCE_THRESHOLD = float(os.getenv("PROXY_CONFIDENCE_THRESHOLD", 0.85))
+
+_DEVANAGARI = re.compile(r"[ऀ-ॿ]")
+_LATIN = re.compile(r"[A-Za-z]")
+# Common romanised Hindi function words; their presence means the question
+# needs translating, which only the LLM can do.
+_HINGLISH = re.compile(
+    r"\b(?:mera|meri|mere|hai|hain|nahi|nahin|kab|kyun|kyon|kaise|kya|"
+    r"ka|ki|ke|ko|se|mein|hua|hui|gaya|gayi|raha|rahi|abhi|tak)\b",
+    re.IGNORECASE
+)
+
+CATEGORY_PATTERNS = {
+    category: re.compile(
+        r"\b(?:" + "|".join(
+            re.escape(k) for k in sorted(info.get("keywords", []), key=len, reverse=True)
+        ) + r")\b",
+        re.IGNORECASE
+    )
+    for category, info in DEPARTMENTS["categories"].items()
+    if info.get("keywords")
+}
+
+
+def detect_language(question: str) -> str:
+    has_devanagari = bool(_DEVANAGARI.search(question))
+    has_latin = bool(_LATIN.search(question))
+    if has_devanagari:
+        return "mixed" if has_latin else "hindi"
+    if _HINGLISH.search(question):
+        return "mixed"
+    return "english" if has_latin else "other"
+
+
+def predict(question: str) -> tuple:
+    """
+    Return (category, language, confidence). Confidence grows with the number
+    of distinct keywords matched for the winning category and shrinks with
+    the share of matches claimed by other categories; it is 0 for anything
+    that isn't plain English.
+    """
+    language = detect_language(question)
+    hits = {}
+    for category, pattern in CATEGORY_PATTERNS.items():
+        found = {m.lower() for m in pattern.findall(question)}
+        if found:
+            hits[category] = len(found)
+    if not hits:
+        return "other", language, 0.0
+
+    category = max(hits, key=hits.get)
+    top = hits[category]
+    confidence = (top / sum(hits.values())) * (1 - 0.3 ** top)
+    if language != "english":
+        confidence = 0.0
+    return category, language, confidence
@@ -2,27 +2,28 @@
 query_agent.py — Agent 1: Query Understanding Agent
 """
 import json
-import os
+import logging
 import re
 
-from dotenv import load_dotenv
-from google import genai
-from google.genai import types
+from ._batcher import MicroBatcher
+from ._json_utils import loads_json
+from ._llm_cache import cached_generate, cached_generate_async
+from ._query_cache import QueryCache
+from ._schemas import QueryAnalysis
+from ._templates import templates
+from .proxy_classifier import CATEGORY_PATTERNS, CONFIDENCE_THRESHOLD, predict
+from .routing_agent import ALIAS_PATTERN
 
-load_dotenv()
-client = genai.Client(api_key=os.getenv("GEMINI_API_KEY"))
-MODEL = "models/gemini-2.0-flash-lite-lite"
+logger = logging.getLogger(__name__)
 
-
-def _clean_json(raw: str) -> str:
-    raw = raw.strip()
-    raw = re.sub(r"^```(?:json)?\s*", "", raw)
-    raw = re.sub(r"\s*```$", "", raw)
-    return raw.strip()
+QUESTION_STARTERS = (
+    *templates()["question_starters"]["general"],
+    "Please provide the reasons for delay in resolving",
+)
 
 
 def _fallback_response(citizen_question: str, error: str = "") -> dict:
-    print(f"[QueryAgent] Using fallback. Reason: {error}")
+    logger.warning("Using fallback. Reason: %s", error)
     return {
         "original_question": citizen_question,
         "detected_language": "english",
@@ -45,9 +46,80 @@ def _fallback_response(citizen_question: str, error: str = "") -> dict:
     }
 
 
+# Details a template can't carry: digits, number words, dates and periods.
+_NUMERIC = re.compile(
+    r"\d|\b(?:one|two|three|four|five|six|seven|eight|nine|ten|eleven|twelve|"
+    r"twenty|thirty|forty|fifty|hundred|thousand|lakh|crore|half|dozen|"
+    r"january|february|march|april|june|july|august|september|october|"
+    r"november|december|since|ago|last|day|days|week|weeks|month|months|"
+    r"year|years)\b",
+    re.IGNORECASE
+)
+_CAPITALISED = re.compile(r"\b[A-Z][\w.]*")
+# Cues that the request may not be a valid RTI: a private body, or third-party
+# personal information (Section 8(1)(j)), or a matter before a court.
+_NEEDS_REVIEW = re.compile(
+    r"\b(?:private|personal|neighbou?r|salary of|phone number of|address of|"
+    r"court|case)\b",
+    re.IGNORECASE
+)
+
+
+def _local_location(citizen_question: str):
+    """
+    Decide whether the template answer can represent this question. Returns
+    the location to record ("Not specified" if none), or None when the
+    question carries details only Gemini can extract: numbers or periods,
+    names other than known places, or signs it may not be a valid RTI.
+    """
+    if _NUMERIC.search(citizen_question) or _NEEDS_REVIEW.search(citizen_question):
+        return None
+    lowered = citizen_question.lower()
+    places = list(ALIAS_PATTERN.finditer(lowered))
+    for word in _CAPITALISED.finditer(citizen_question):
+        start = word.start()
+        if start == 0 or citizen_question[:start].rstrip()[-1:] in ".!?" or word.group() == "I":
+            continue
+        if any(p.start() <= start < p.end() for p in places):
+            continue
+        if any(pattern.fullmatch(word.group()) for pattern in CATEGORY_PATTERNS.values()):
+            continue
+        return None
+    names = dict.fromkeys(p.group().title() for p in places)
+    return ", ".join(names) or "Not specified"
+
+
+def _local_response(citizen_question: str, category: str, language: str, location: str) -> dict:
+    """
+    Same shape as the Gemini reply, built from the proxy classifier's guess.
+    Only used once _local_location() has accepted the question: its category
+    names a public authority's service and nothing suggests an exemption, so
+    it is treated as a valid RTI.
+    """
+    topic = citizen_question.strip().rstrip("?.!")
+    place = f" in {location}" if location != "Not specified" else ""
+    issue = f"the {category.replace('_', ' ')} issue{place} described in this application"
+    return {
+        "original_question": citizen_question,
+        "detected_language": language,
+        "translated_question": citizen_question,
+        "subject": f"Request for Information - {category.replace('_', ' ').title()}: {topic[:80]}",
+        "category": category,
+        "extracted_info": {
+            "what_is_needed": citizen_question,
+            "time_period": "last 3 years",
+            "location": location,
+            "specific_issue": citizen_question
+        },
+        "suggested_questions": [f"{starter} {issue}." for starter in QUESTION_STARTERS],
+        "urgency": "medium",
+        "is_valid_rti": True,
+        "invalid_reason": ""
+    }
+
+
 SYSTEM_PROMPT = """You are an expert RTI (Right to Information) assistant in India.
-Analyze the citizen's question and return ONLY a valid JSON object.
-NO markdown, NO code fences, NO extra text before or after.
+Analyze the citizen's question and return a JSON object.
 
 JSON fields required:
 - original_question: string (exact citizen input)
@@ -81,28 +153,116 @@ QUESTION RULES:
 """
 
 
+# The schema makes Gemini emit a bare JSON object, so there are no fences
+# to strip and no tokens spent on them.
+# SYSTEM_PROMPT goes in as the cached prefix, so each request only sends
+# (and is billed for) the citizen's question.
+ANALYZE_CONFIG = {
+    "max_tokens": 1500,
+    "temperature": 0.1,
+    "prefix": SYSTEM_PROMPT,
+    "response_mime_type": "application/json",
+    "response_schema": QueryAnalysis,
+}
+
+
+BATCH_PROMPT_HEADER = (
+    "You will receive several numbered citizen questions. Analyze each one "
+    "independently and return ONLY a JSON array with exactly one object per "
+    "question, in the same order.\n\n"
+)
+
+
+def _analyze_prompt(citizen_question: str) -> str:
+    return f"Citizen question: {citizen_question}"
+
+
+def _analyze_batch_prompt(questions: list) -> str:
+    numbered = "\n".join(f"QUESTION {i}: {q}" for i, q in enumerate(questions, 1))
+    return f"{BATCH_PROMPT_HEADER}{numbered}"
+
+
 class QueryAgent:
+    def __init__(self):
+        self._cache = QueryCache()
+        self._batcher = MicroBatcher(self._analyze_batch, self._analyze_one, window=0.04)
+
     def analyze(self, citizen_question: str) -> dict:
+        local = self._answer_locally(citizen_question)
+        if local is not None:
+            return local
         try:
-            prompt = f"{SYSTEM_PROMPT}\n\nCitizen question: {citizen_question}"
-            response = client.models.generate_content(
-                model=MODEL,
-                contents=prompt,
-                config=types.GenerateContentConfig(
-                    temperature=0.1,
-                    max_output_tokens=1500
-                )
-            )
-            raw = response.text
-            print(f"[QueryAgent] Raw response: {raw[:300]}...")
-            cleaned = _clean_json(raw)
-            result = json.loads(cleaned)
-            print(f"[QueryAgent] category={result.get('category')} | subject={result.get('subject')}")
-            return result
+            raw = cached_generate(_analyze_prompt(citizen_question), **ANALYZE_CONFIG)
+            return self._accept(citizen_question, raw)
+        except json.JSONDecodeError as e:
+            return _fallback_response(citizen_question, f"JSON parse error: {e}")
+        except Exception as e:
+            logger.warning("Error: %s", e)
+            return _fallback_response(citizen_question, str(e))
 
+    async def analyze_async(self, citizen_question: str) -> dict:
+        """
+        analyze() on the async Gemini client. Questions arriving within the
+        batcher's window are analysed together in one request.
+        """
+        local = self._answer_locally(citizen_question)
+        if local is not None:
+            return local
+        try:
+            return await self._batcher.submit(citizen_question)
         except json.JSONDecodeError as e:
-            print(f"[QueryAgent] JSON error: {e} | raw was: {raw[:400]}")
             return _fallback_response(citizen_question, f"JSON parse error: {e}")
         except Exception as e:
-            print(f"[QueryAgent] Error: {e}")
-            return _fallback_response(citizen_question, str(e))            
\ No newline at end of file
+            logger.warning("Error: %s", e)
+            return _fallback_response(citizen_question, str(e))
+
+    async def _analyze_one(self, citizen_question: str) -> dict:
+        raw = await cached_generate_async(_analyze_prompt(citizen_question), **ANALYZE_CONFIG)
+        return self._accept(citizen_question, raw)
+
+    async def _analyze_batch(self, questions: list) -> list:
+        raw = await cached_generate_async(
+            _analyze_batch_prompt(questions),
+            **{
+                **ANALYZE_CONFIG,
+                "max_tokens": ANALYZE_CONFIG["max_tokens"] * len(questions),
+                "response_schema": list[QueryAnalysis],
+            }
+        )
+        logger.debug("Batch of %d raw response: %.300s", len(questions), raw)
+        results = loads_json(raw)
+        if not isinstance(results, list) or len(results) != len(questions):
+            raise ValueError(f"expected {len(questions)} analyses")
+        for question, result in zip(questions, results):
+            if result.get("is_valid_rti") is True:
+                self._cache.put(question, result)
+        return results
+
+    def _answer_locally(self, citizen_question: str):
+        """Cached or proxy-classified answer, or None when Gemini is needed."""
+        cached = self._cache.get(citizen_question)
+        if cached is not None:
+            return cached
+
+        category, language, confidence = predict(citizen_question)
+        if confidence < CONFIDENCE_THRESHOLD:
+            return None
+        location = _local_location(citizen_question)
+        if location is None:
+            logger.debug("category=%s needs Gemini for question details", category)
+            return None
+        logger.info("category=%s answered locally (confidence %.2f)", category, confidence)
+        return _local_response(citizen_question, category, language, location)
+
+    def _accept(self, citizen_question: str, raw: str) -> dict:
+        logger.debug("Raw response: %.300s", raw)
+        try:
+            result = loads_json(raw)
+        except json.JSONDecodeError as e:
+            logger.warning("JSON error: %s | raw was: %.400s", e, raw)
+            raise
+        logger.info("category=%s | subject=%s", result.get("category"), result.get("subject"))
+        # Only valid RTI questions are worth reusing; rejections are cheap to redo.
+        if result.get("is_valid_rti") is True:
+            self._cache.put(citizen_question, result)
+        return result
@@ -1,21 +1,52 @@
 """
 routing_agent.py — Agent 2: Department Routing Agent
 """
-import json
+import functools
+import itertools
+import logging
 import os
+import pickle
+import re
 from pathlib import Path
 
-from dotenv import load_dotenv
-from google import genai
+import orjson
 
-load_dotenv()
-client = genai.Client(api_key=os.getenv("GEMINI_API_KEY"))
+logger = logging.getLogger(__name__)
 
 DATA_DIR = Path(__file__).parent.parent / "data"
-with open(DATA_DIR / "pio_directory.json") as f:
-    PIO_DIRECTORY = json.load(f)
-with open(DATA_DIR / "departments.json") as f:
-    DEPARTMENTS = json.load(f)
+
+
+def _load_cached(path: Path):
+    """
+    Load a JSON data file through a pickle snapshot stored beside it. The
+    snapshot records the JSON's mtime and is rebuilt whenever that changes.
+    """
+    snapshot = path.with_suffix(".pkl")
+    mtime = path.stat().st_mtime_ns
+    try:
+        with open(snapshot, "rb") as f:
+            cached_mtime, data = pickle.load(f)
+        if cached_mtime == mtime:
+            return data
+    except Exception as e:
+        # Missing, truncated or stale (e.g. pickled before a rename) snapshots
+        # raise all sorts of errors; any of them just means "rebuild".
+        logger.debug("rebuilding %s: %r", snapshot.name, e)
+
+    data = orjson.loads(path.read_bytes())
+    tmp = snapshot.with_suffix(f".{os.getpid()}.tmp")
+    try:
+        with open(tmp, "wb") as f:
+            pickle.dump((mtime, data), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, snapshot)
+    except OSError as e:
+        tmp.unlink(missing_ok=True)
+        logger.debug("could not write %s: %s", snapshot.name, e)
+    return data
+
+
+PIO_DIRECTORY = _load_cached(DATA_DIR / "pio_directory.json")
+DEPARTMENTS = _load_cached(DATA_DIR / "departments.json")
 
 STATE_SUBJECTS = {"food_ration", "electricity", "water", "housing", "road_infrastructure"}
 
@@ -57,6 +88,69 @@ STATE_ALIASES = {
     "goa": "Goa", "chhattisgarh": "Chhattisgarh", "raipur": "Chhattisgarh",
 }
 
+# One pass over the text for all aliases. Longest aliases first so "new delhi"
+# wins over "delhi"; word boundaries stop "up" matching inside "update".
+ALIAS_PATTERN = re.compile(
+    r"\b(?:" + "|".join(
+        re.escape(a) for a in sorted(STATE_ALIASES, key=len, reverse=True)
+    ) + r")\b"
+)
+PIO_STATES = {k.lower(): k for k in PIO_DIRECTORY.get("state", {})}
+
+# Lookup tables over the static directory, built once at import.
+CENTRAL_BY_ID = {p["id"]: p for p in PIO_DIRECTORY.get("central", [])}
+# Each PIO's categories as a set of lower-cased phrases and their words, so
+# keyword matching is a frozenset intersection rather than substring scans.
+PIO_CATEGORY_TOKENS = {
+    p["id"]: frozenset(itertools.chain.from_iterable(
+        (c.lower(), *c.lower().split()) for c in p.get("categories", [])
+    ))
+    for p in itertools.chain(
+        PIO_DIRECTORY.get("central", []),
+        *PIO_DIRECTORY.get("state", {}).values()
+    )
+}
+CATEGORY_KEYWORDS = {
+    category: frozenset(k.lower() for k in info.get("keywords", []))
+    for category, info in DEPARTMENTS["categories"].items()
+}
+# keyword -> categories listing it, plus one pattern over every keyword, so
+# a category can be recovered from the question text in a single scan.
+KEYWORD_CATEGORIES = {}
+for category, keywords in CATEGORY_KEYWORDS.items():
+    for kw in keywords:
+        KEYWORD_CATEGORIES.setdefault(kw, []).append(category)
+del category, keywords, kw
+KEYWORD_PATTERN = re.compile(
+    r"\b(?:" + "|".join(
+        re.escape(k) for k in sorted(KEYWORD_CATEGORIES, key=len, reverse=True)
+    ) + r")\b"
+)
+
+
+def _keyword_category(text: str) -> str:
+    """Category with the most distinct keyword hits in lower-cased `text`, or "other"."""
+    votes = {}
+    for kw in set(KEYWORD_PATTERN.findall(text)):
+        for category in KEYWORD_CATEGORIES[kw]:
+            votes[category] = votes.get(category, 0) + 1
+    # max() keeps the first of equal counts, i.e. departments.json order
+    return max(votes, key=votes.get) if votes else "other"
+
+
+FALLBACK_PIO_IDS = {
+    "food_ration": "C009", "health": "C002", "education": "C003",
+    "road_infrastructure": "C004", "postal": "C005", "income_tax": "C006",
+    "employment": "C007", "lpg_petroleum": "C008", "housing": "C010",
+    "railways": "C001",
+}
+
+
+def _find_alias(text: str):
+    """Return (alias, state) for the first alias in lower-cased `text`, or None."""
+    m = ALIAS_PATTERN.search(text)
+    return (m.group(), STATE_ALIASES[m.group()]) if m else None
+
 
 def _normalize_state(raw: str) -> str:
     if not raw:
@@ -64,21 +158,29 @@ def _normalize_state(raw: str) -> str:
     key = raw.strip().lower()
     if key in STATE_ALIASES:
         normalized = STATE_ALIASES[key]
-        print(f"[RoutingAgent] Alias: '{raw}' → '{normalized}'")
+        logger.debug("Alias: '%s' → '%s'", raw, normalized)
         return normalized
+    if key in PIO_STATES:
+        return PIO_STATES[key]
+    # Free text such as "Ernakulam district" or "Kochi, Kerala"
+    found = _find_alias(key)
+    if found:
+        logger.debug("Alias: '%s' in '%s' → '%s'", found[0], raw, found[1])
+        return found[1]
     title = raw.strip().title()
-    if title in PIO_DIRECTORY.get("state", {}):
-        return title
-    for k in PIO_DIRECTORY.get("state", {}).keys():
-        if k.lower() == key:
-            return k
-    print(f"[RoutingAgent] Unknown state '{raw}'")
+    logger.warning("Unknown state '%s'", raw)
     return title
 
 
 class RoutingAgent:
     def route(self, query_analysis: dict, user_state: str = "Delhi") -> dict:
         category = query_analysis.get("category", "other")
+        if category not in CATEGORY_KEYWORDS:
+            # LLM fallback or an off-list label: recover it from the question.
+            category = _keyword_category(" ".join((
+                query_analysis.get("original_question", ""),
+                query_analysis.get("extracted_info", {}).get("specific_issue", "")
+            )).lower())
         state = _normalize_state(user_state)
 
         # Backup: extract state from question text if state PIOs not found
@@ -90,9 +192,9 @@ class RoutingAgent:
             if extracted:
                 state = extracted
 
-        print(f"[RoutingAgent] category={category} | state={state}")
+        logger.info("category=%s | state=%s", category, state)
         pio = self._find_pio(category, state)
-        print(f"[RoutingAgent] → {pio.get('department')} ({pio.get('id')})")
+        logger.info("→ %s (%s)", pio.get("department"), pio.get("id"))
 
         return {
             "pio": pio,
@@ -105,47 +207,38 @@ class RoutingAgent:
         }
 
     def _extract_state_from_question(self, question: str, location: str) -> str:
-        combined = f"{question} {location}".lower()
-        for alias, state in STATE_ALIASES.items():
-            if alias in combined:
-                print(f"[RoutingAgent] Found '{alias}' in question → '{state}'")
-                return state
+        found = _find_alias(f"{question} {location}".lower())
+        if found:
+            logger.debug("Found '%s' in question → '%s'", *found)
+            return found[1]
         return ""
 
     def _find_pio(self, category: str, state: str) -> dict:
-        dept_info = DEPARTMENTS["categories"].get(category, {})
-        keywords = [k.lower() for k in dept_info.get("keywords", [])]
-        central_id = dept_info.get("central_pio_id")
-
-        if category in STATE_SUBJECTS:
-            state_pios = PIO_DIRECTORY.get("state", {}).get(state, [])
-            print(f"[RoutingAgent] State PIOs for '{state}': {len(state_pios)}")
-            if state_pios:
-                for pio in state_pios:
-                    cats = " ".join(c.lower() for c in pio.get("categories", []))
-                    if any(kw in cats for kw in keywords) or category in cats:
-                        return pio
-                return state_pios[0]
-
-        if central_id:
-            for pio in PIO_DIRECTORY.get("central", []):
-                if pio["id"] == central_id:
+        return _find_pio(category, state)
+
+
+@functools.lru_cache(maxsize=4096)
+def _find_pio(category: str, state: str) -> dict:
+    """Resolved once per (category, state); the directory never changes at runtime."""
+    keywords = CATEGORY_KEYWORDS.get(category, frozenset())
+
+    if category in STATE_SUBJECTS:
+        state_pios = PIO_DIRECTORY.get("state", {}).get(state, [])
+        logger.debug("State PIOs for '%s': %d", state, len(state_pios))
+        if state_pios:
+            for pio in state_pios:
+                tokens = PIO_CATEGORY_TOKENS[pio["id"]]
+                if keywords & tokens or category in tokens:
                     return pio
+            return state_pios[0]
 
-        for pio in PIO_DIRECTORY.get("central", []):
-            cats = " ".join(c.lower() for c in pio.get("categories", []))
-            if any(kw in cats for kw in keywords):
-                return pio
+    central_id = DEPARTMENTS["categories"].get(category, {}).get("central_pio_id")
+    if central_id in CENTRAL_BY_ID:
+        return CENTRAL_BY_ID[central_id]
 
-        fallback_map = {
-            "food_ration": "C009", "health": "C002", "education": "C003",
-            "road_infrastructure": "C004", "postal": "C005", "income_tax": "C006",
-            "employment": "C007", "lpg_petroleum": "C008", "housing": "C010",
-            "railways": "C001",
-        }
-        fallback_id = fallback_map.get(category, "C009")
-        for pio in PIO_DIRECTORY.get("central", []):
-            if pio["id"] == fallback_id:
-                return pio
+    for pio in PIO_DIRECTORY.get("central", []):
+        if keywords & PIO_CATEGORY_TOKENS[pio["id"]]:
+            return pio
 
-        return PIO_DIRECTORY["central"][0]      
\ No newline at end of file
+    fallback_id = FALLBACK_PIO_IDS.get(category, "C009")
+    return CENTRAL_BY_ID.get(fallback_id, PIO_DIRECTORY["central"][0])
@@ -2,27 +2,43 @@
 main.py — FastAPI Application Entry Point for RTI-Saarthi
 Run: uvicorn main:app --reload --port 8000
 """
-import json
+import asyncio
+import functools
+import hashlib
+import logging
+import multiprocessing
 import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
-from typing import Optional
+from pathlib import Path
+from typing import List, Optional
 
+import orjson
 from dotenv import load_dotenv
-from fastapi import Depends, FastAPI, HTTPException
+from fastapi import BackgroundTasks, Depends, FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
+from fastapi.responses import FileResponse, ORJSONResponse, StreamingResponse
 from pydantic import BaseModel
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 load_dotenv()
+logging.basicConfig(
+    level=os.getenv("LOG_LEVEL", "INFO"),
+    format="%(asctime)s %(levelname)s [%(name)s] %(message)s"
+)
 
-# Internal imports
-from agents import (AppealAgent, DraftingAgent, FilingAgent, QueryAgent,
-                    RoutingAgent)
-from utils.database import RTIApplication, generate_ref_number, get_db, init_db
-from utils.pdf_generator import generate_rti_pdf
+logger = logging.getLogger(__name__)
 
-print("Gemini Key:", os.getenv("GEMINI_API_KEY"))
+# Internal imports
+from agents import (AgentOrchestrator, AppealAgent, DraftingAgent,
+                    FilingAgent, QueryAgent, RoutingAgent, close_http_clients)
+from agents._batcher import MicroBatcher
+from agents.routing_agent import PIO_DIRECTORY
+from utils.database import (RTIApplication, SessionLocal, close_db, find_rti, get_db,
+                            get_stats, init_db, response_metrics, save_applications)
+from utils.pdf_generator import write_rti_pdf
 
 # ── Initialize FastAPI ────────────────────────────────────────
 app = FastAPI(
@@ -30,7 +46,8 @@ app = FastAPI(
     description="AI-Powered Right to Information Filing Agent",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=ORJSONResponse
 )
 
 # ── CORS ──────────────────────────────────────────────────────
@@ -44,16 +61,47 @@ app.add_middleware(
 
 # ── Initialize DB on startup ──────────────────────────────────
 @app.on_event("startup")
-def startup():
-    init_db()
-    print("✅ RTI-Saarthi API started. DB initialized.")
+async def startup():
+    await init_db()
+    logger.info("RTI-Saarthi API started. DB initialized.")
+
+@app.on_event("shutdown")
+async def shutdown():
+    await close_http_clients()
+    await close_db()
+    pdf_pool.shutdown(wait=False, cancel_futures=True)
+
+# ── Agents ────────────────────────────────────────────────────
+# Built on first use, once per worker: a worker that only serves lookups,
+# PDFs or analytics never warms the query cache or starts agent batchers.
+@functools.cache
+def get_query_agent() -> QueryAgent:
+    return QueryAgent()
+
+
+@functools.cache
+def get_routing_agent() -> RoutingAgent:
+    return RoutingAgent()
+
+
+@functools.cache
+def get_filing_agent() -> FilingAgent:
+    return FilingAgent()
 
-# ── Initialize Agents ─────────────────────────────────────────
-query_agent    = QueryAgent()
-routing_agent  = RoutingAgent()
-drafting_agent = DraftingAgent()
-filing_agent   = FilingAgent()
-appeal_agent   = AppealAgent()
+
+@functools.cache
+def get_appeal_agent() -> AppealAgent:
+    return AppealAgent()
+
+
+@functools.cache
+def get_drafting_agent() -> DraftingAgent:
+    return DraftingAgent()
+
+
+@functools.cache
+def get_orchestrator() -> AgentOrchestrator:
+    return AgentOrchestrator(get_drafting_agent(), get_appeal_agent())
 
 
 # ── Pydantic Models ───────────────────────────────────────────
@@ -61,6 +109,10 @@ class AnalyzeRequest(BaseModel):
     question: str
     language: Optional[str] = "en"
 
+class RouteRequest(AnalyzeRequest):
+    # What /api/analyze returned for this question; skips a second analysis.
+    query_analysis: Optional[dict] = None
+
 class RTIFilingRequest(BaseModel):
     question: str
     applicant_name: str
@@ -89,10 +141,10 @@ def root():
 
 
 @app.post("/api/analyze")
-def analyze_question(req: AnalyzeRequest):
+async def analyze_question(req: AnalyzeRequest):
     """Agent 1: Analyze citizen's question and extract RTI intent."""
     try:
-        result = query_agent.analyze(req.question)
+        result = await get_query_agent().analyze_async(req.question)
         return {"success": True, "data": result}
     except Exception as e:
         import traceback
@@ -101,92 +153,200 @@ def analyze_question(req: AnalyzeRequest):
 
 
 @app.post("/api/route")
-def route_department(req: AnalyzeRequest, state: str = "Delhi"):
+async def route_department(req: RouteRequest, state: str = "Delhi"):
     """Agent 2: Find the correct department and PIO."""
     try:
-        query_result = query_agent.analyze(req.question)
-        routing = routing_agent.route(query_result, state)
+        query_result = req.query_analysis or await get_query_agent().analyze_async(req.question)
+        routing = get_routing_agent().route(query_result, state)
         return {"success": True, "data": routing}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _applicant(req: RTIFilingRequest) -> dict:
+    return {
+        "name": req.applicant_name,
+        "address": req.applicant_address,
+        "mobile": req.applicant_mobile,
+        "email": req.applicant_email,
+        "is_bpl": req.is_bpl,
+        "bpl_card_no": req.bpl_card_no
+    }
+
+
+@app.post("/api/draft-stream")
+async def draft_stream(req: RTIFilingRequest):
+    """
+    Agent 3, streamed: NDJSON lines of {field: value}. The routing arrives
+    first, then subject, formal_questions and the rest of the draft as soon
+    as Gemini has written each one, so the form fills in while the full
+    letter is still being generated. Nothing is saved; /api/file-rti files.
+    """
+    try:
+        query_result = await get_query_agent().analyze_async(req.question)
+        routing = get_routing_agent().route(query_result, req.user_state)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"draft failed: {str(e)}")
+
+    async def lines():
+        yield orjson.dumps({"query_analysis": query_result, "routing": routing}) + b"\n"
+        async for key, value in get_drafting_agent().draft_stream(query_result, routing,
+                                                                  _applicant(req)):
+            yield orjson.dumps({key: value}) + b"\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+async def _save_one(record: RTIApplication) -> str:
+    return (await save_applications([record]))[0]
+
+
+# Group commit: filings arriving within 50 ms share one transaction. Each
+# request still waits for its own commit, so nothing is acknowledged early.
+rti_writer = MicroBatcher(save_applications, _save_one, max_batch=32, window=0.05)
+
+
+async def _prepare_filing(req: RTIFilingRequest) -> dict:
+    """Run the agents for one filing and build its (not yet saved) record."""
+    query_result = await get_query_agent().analyze_async(req.question)
+    routing = get_routing_agent().route(query_result, req.user_state)
+    generated = await get_orchestrator().generate_all_async(query_result, routing,
+                                                            _applicant(req))
+    draft = generated["draft"]
+
+    record = RTIApplication(
+        applicant_name=req.applicant_name,
+        applicant_email=req.applicant_email,
+        applicant_mobile=req.applicant_mobile,
+        applicant_address=req.applicant_address,
+        is_bpl=req.is_bpl,
+        bpl_card_no=req.bpl_card_no,
+        original_query=req.question,
+        language=req.language,
+        department=routing.get("department"),
+        pio_id=routing.get("pio", {}).get("id"),
+        pio_name=routing.get("pio", {}).get("pio_name"),
+        pio_email=routing.get("pio", {}).get("email"),
+        subject=draft.get("subject"),
+        questions=draft.get("formal_questions") or [],
+        draft_text=draft.get("full_application_text"),
+        status="filed",
+        filed_date=datetime.now(),
+    )
+    return {"record": record, "query_analysis": query_result, "routing": routing,
+            "draft": draft, "prediction": generated["prediction"]}
+
+
+def _complete_filing(filing: dict, ref_number: str, background_tasks: BackgroundTasks) -> dict:
+    """File with the PIO, queue the PDF render and shape the response."""
+    routing, draft = filing["routing"], filing["draft"]
+    filing_result = get_filing_agent().file(draft, routing, ref_number)
+    background_tasks.add_task(_render_pdf, PDF_CACHE_DIR / f"{ref_number}.pdf",
+                              _pdf_data(filing["record"]))
+    return {
+        "success": True,
+        "ref_number": ref_number,
+        "query_analysis": filing["query_analysis"],
+        "routing": {
+            "department": routing.get("department"),
+            "pio_name": routing.get("pio", {}).get("pio_name"),
+            "pio_email": routing.get("pio", {}).get("email"),
+            "portal": routing.get("filing_url"),
+            "jurisdiction": routing.get("jurisdiction")
+        },
+        "draft": {
+            "subject": draft.get("subject"),
+            "questions": draft.get("formal_questions"),
+            "full_text": draft.get("full_application_text"),
+            "filed_date": draft.get("filed_date"),
+            "deadline_date": draft.get("deadline_date")
+        },
+        "filing": filing_result,
+        "prediction": filing["prediction"]
+    }
+
+
 @app.post("/api/file-rti")
-def file_rti(req: RTIFilingRequest, db: Session = Depends(get_db)):
-    """Main endpoint: Run all 5 agents and file RTI end-to-end."""
+async def file_rti(req: RTIFilingRequest, background_tasks: BackgroundTasks):
+    """
+    Main endpoint: Run all 5 agents and file RTI end-to-end.
+    LLM calls go through the async client; the record is persisted by the
+    group-commit writer, which also assigns its reference number. The PDF is
+    rendered in the PDF worker pool after the response is sent, so the
+    citizen's first download is already cached.
+    """
     try:
-        query_result = query_agent.analyze(req.question)
-        routing = routing_agent.route(query_result, req.user_state)
-
-        applicant = {
-            "name": req.applicant_name,
-            "address": req.applicant_address,
-            "mobile": req.applicant_mobile,
-            "email": req.applicant_email,
-            "is_bpl": req.is_bpl,
-            "bpl_card_no": req.bpl_card_no
-        }
-        draft = drafting_agent.draft(query_result, routing, applicant)
-        ref_number = generate_ref_number(db)
-        filing_result = filing_agent.file(draft, routing, ref_number)
-        prediction = appeal_agent.predict_success(query_result, routing)
-
-        rti_record = RTIApplication(
-            ref_number=ref_number,
-            applicant_name=req.applicant_name,
-            applicant_email=req.applicant_email,
-            applicant_mobile=req.applicant_mobile,
-            applicant_address=req.applicant_address,
-            is_bpl=req.is_bpl,
-            bpl_card_no=req.bpl_card_no,
-            original_query=req.question,
-            language=req.language,
-            department=routing.get("department"),
-            pio_id=routing.get("pio", {}).get("id"),
-            pio_name=routing.get("pio", {}).get("pio_name"),
-            pio_email=routing.get("pio", {}).get("email"),
-            subject=draft.get("subject"),
-            questions=json.dumps(draft.get("formal_questions", [])),
-            draft_text=draft.get("full_application_text"),
-            status="filed",
-            filed_date=datetime.now(),
-        )
-        db.add(rti_record)
-        db.commit()
-        db.refresh(rti_record)
-
-        return {
-            "success": True,
-            "ref_number": ref_number,
-            "query_analysis": query_result,
-            "routing": {
-                "department": routing.get("department"),
-                "pio_name": routing.get("pio", {}).get("pio_name"),
-                "pio_email": routing.get("pio", {}).get("email"),
-                "portal": routing.get("filing_url"),
-                "jurisdiction": routing.get("jurisdiction")
-            },
-            "draft": {
-                "subject": draft.get("subject"),
-                "questions": draft.get("formal_questions"),
-                "full_text": draft.get("full_application_text"),
-                "filed_date": draft.get("filed_date"),
-                "deadline_date": draft.get("deadline_date")
-            },
-            "filing": filing_result,
-            "prediction": prediction
-        }
+        filing = await _prepare_filing(req)
+        ref_number = await rti_writer.submit(filing["record"])
+        return _complete_filing(filing, ref_number, background_tasks)
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"RTI Filing failed: {str(e)}")
 
 
+MAX_BULK_FILINGS = int(os.getenv("MAX_BULK_FILINGS", 100))
+
+
+@app.post("/api/file-rti-bulk")
+async def file_rti_bulk(reqs: List[RTIFilingRequest], background_tasks: BackgroundTasks):
+    """
+    Bulk filing for organisations submitting many RTIs at once. Agents run
+    concurrently for every item and all successful records are inserted in
+    one transaction. Results come back in request order; an item whose agents
+    failed is reported with its error and is not saved.
+    """
+    if len(reqs) > MAX_BULK_FILINGS:
+        raise HTTPException(status_code=413,
+                            detail=f"At most {MAX_BULK_FILINGS} filings per request")
+
+    prepared = await asyncio.gather(*(_prepare_filing(r) for r in reqs), return_exceptions=True)
+    filings = [f for f in prepared if not isinstance(f, Exception)]
+    try:
+        refs = await save_applications([f["record"] for f in filings]) if filings else []
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"RTI Filing failed: {str(e)}")
+
+    ref_iter = iter(refs)
+    results = []
+    for f in prepared:
+        if isinstance(f, Exception):
+            logger.warning("bulk filing item failed: %s", f)
+            results.append({"success": False, "error": f"RTI Filing failed: {str(f)}"})
+        else:
+            results.append(_complete_filing(f, next(ref_iter), background_tasks))
+    return {"success": True, "filed": len(refs), "results": results}
+
+
+RTI_VIEW_COLUMNS = (
+    RTIApplication.ref_number, RTIApplication.applicant_name, RTIApplication.department,
+    RTIApplication.subject, RTIApplication.status, RTIApplication.filed_date,
+    RTIApplication.questions, RTIApplication.draft_text, RTIApplication.updated_at,
+)
+RTI_CACHE_CONTROL = "private, max-age=300"
+
+
+def _rti_etag(ref_number: str, updated_at) -> str:
+    version = int(updated_at.timestamp() * 1_000_000) if updated_at else 0
+    return f'W/"{ref_number}-{version}"'
+
+
 @app.get("/api/rti/{ref_number}")
-def get_rti(ref_number: str, db: Session = Depends(get_db)):
-    rti = db.query(RTIApplication).filter(RTIApplication.ref_number == ref_number).first()
+async def get_rti(ref_number: str, request: Request, db: AsyncSession = Depends(get_db)):
+    # A record only changes when its status does (which bumps updated_at), so
+    # revalidation reads that single column and answers 304 when unchanged.
+    if request.headers.get("if-none-match"):
+        row = await find_rti(db, ref_number, RTIApplication.updated_at)
+        if row:
+            etag = _rti_etag(ref_number, row.updated_at)
+            if _etag_matches(request, etag):
+                return Response(status_code=304,
+                                headers={"ETag": etag, "Cache-Control": RTI_CACHE_CONTROL})
+
+    rti = await find_rti(db, ref_number, *RTI_VIEW_COLUMNS)
     if not rti:
         raise HTTPException(status_code=404, detail="RTI not found")
-    return {
+    headers = {"ETag": _rti_etag(ref_number, rti.updated_at), "Cache-Control": RTI_CACHE_CONTROL}
+    return ORJSONResponse(headers=headers, content={
         "success": True,
         "data": {
             "ref_number": rti.ref_number,
@@ -195,19 +355,32 @@ def get_rti(ref_number: str, db: Session = Depends(get_db)):
             "subject": rti.subject,
             "status": rti.status,
             "filed_date": rti.filed_date.isoformat() if rti.filed_date else None,
-            "questions": json.loads(rti.questions) if rti.questions else [],
+            "questions": rti.questions or [],
             "draft_text": rti.draft_text
         }
-    }
-
+    })
+
+
+PDF_CACHE_DIR = Path(os.getenv("PDF_CACHE_DIR", Path(__file__).parent / "data" / "pdf_cache"))
+PDF_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", min(4, os.cpu_count() or 1)))
+# Separate processes keep ReportLab off both the event loop and the GIL.
+# Spawned rather than forked: the parent already runs DB and HTTP threads.
+pdf_pool = ProcessPoolExecutor(max_workers=PDF_WORKERS,
+                               mp_context=multiprocessing.get_context("spawn"))
+REF_NUMBER_PATTERN = re.compile(r"RTI\d{4}-\d{5,}")
+PDF_COLUMNS = (
+    RTIApplication.ref_number, RTIApplication.applicant_name, RTIApplication.applicant_address,
+    RTIApplication.applicant_mobile, RTIApplication.applicant_email, RTIApplication.is_bpl,
+    RTIApplication.bpl_card_no, RTIApplication.department, RTIApplication.pio_name,
+    RTIApplication.subject, RTIApplication.questions, RTIApplication.filed_date,
+    RTIApplication.draft_text,
+)
 
-@app.get("/api/rti/{ref_number}/pdf")
-def download_pdf(ref_number: str, db: Session = Depends(get_db)):
-    rti = db.query(RTIApplication).filter(RTIApplication.ref_number == ref_number).first()
-    if not rti:
-        raise HTTPException(status_code=404, detail="RTI not found")
 
-    pdf_data = {
+def _pdf_data(rti) -> dict:
+    """PDF fields from an RTIApplication or a row selected with PDF_COLUMNS."""
+    return {
         "ref_number": rti.ref_number,
         "applicant_name": rti.applicant_name,
         "applicant_address": rti.applicant_address,
@@ -219,31 +392,79 @@ def download_pdf(ref_number: str, db: Session = Depends(get_db)):
         "pio_name": rti.pio_name,
         "pio_address": "India",
         "subject": rti.subject,
-        "questions": json.loads(rti.questions) if rti.questions else [],
+        "questions": rti.questions or [],
         "filed_date": rti.filed_date.strftime("%d/%m/%Y") if rti.filed_date else "",
         "deadline_date": "",
         "draft_text": rti.draft_text
     }
 
-    pdf_bytes = generate_rti_pdf(pdf_data)
-    return StreamingResponse(
-        iter([pdf_bytes]),
-        media_type="application/pdf",
-        headers={"Content-Disposition": f'attachment; filename="RTI_{ref_number}.pdf"'}
-    )
+
+async def _render_pdf(path: Path, pdf_data: dict):
+    """ReportLab is CPU-bound and holds the GIL, so renders run in pdf_pool's processes."""
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(pdf_pool, write_rti_pdf, pdf_data, str(path))
+
+
+@app.get("/api/rti/{ref_number}/pdf")
+async def download_pdf(ref_number: str, request: Request, db: AsyncSession = Depends(get_db)):
+    # The fields printed on the PDF never change after filing, so the first
+    # render is kept on disk and later downloads skip the DB and ReportLab;
+    # a client revalidating a cached copy gets a 304 without any file read.
+    path = PDF_CACHE_DIR / f"{ref_number}.pdf"
+    headers = {"ETag": f'"{ref_number}-pdf"', "Cache-Control": RTI_CACHE_CONTROL}
+    if REF_NUMBER_PATTERN.fullmatch(ref_number) and path.exists():
+        if _etag_matches(request, headers["ETag"]):
+            return Response(status_code=304, headers=headers)
+        return FileResponse(path, media_type="application/pdf", filename=f"RTI_{ref_number}.pdf",
+                            headers=headers)
+
+    rti = await find_rti(db, ref_number, *PDF_COLUMNS)
+    if not rti:
+        raise HTTPException(status_code=404, detail="RTI not found")
+
+    await _render_pdf(path, _pdf_data(rti))
+    return FileResponse(path, media_type="application/pdf", filename=f"RTI_{ref_number}.pdf",
+                        headers=headers)
+
+
+ANALYTICS_TTL = int(os.getenv("ANALYTICS_TTL", 60))
+ANALYTICS_HEADERS = {"Cache-Control": f"public, max-age={ANALYTICS_TTL}"}
+_analytics_cache = {"expires_at": 0.0, "body": b""}
+# Published national averages, shown until our own RTIs start getting replies.
+BASELINE_RESPONSE_RATE = 72
+BASELINE_RESPONSE_DAYS = 18
 
 
 @app.get("/api/analytics")
-def get_analytics(db: Session = Depends(get_db)):
-    total = db.query(RTIApplication).count()
-    filed = db.query(RTIApplication).filter(RTIApplication.status == "filed").count()
+async def get_analytics():
+    # Dashboard numbers may lag by up to ANALYTICS_TTL; within that window
+    # every hit is served from memory without opening a DB session.
+    now = time.monotonic()
+    if _analytics_cache["expires_at"] <= now:
+        async with SessionLocal() as db:
+            stats = await get_stats(db)
+            metrics = await response_metrics(db)
+        _analytics_cache["body"] = orjson.dumps(_analytics(stats, metrics))
+        _analytics_cache["expires_at"] = now + ANALYTICS_TTL
+    return Response(content=_analytics_cache["body"], media_type="application/json",
+                    headers=ANALYTICS_HEADERS)
+
+
+def _analytics(stats: dict, metrics: dict) -> dict:
+    total = stats.get("total_rtis", 0)
+    filed = stats.get("filed", 0)
+    if metrics["filed"] and metrics["responded"]:
+        response_rate = round(100 * metrics["responded"] / metrics["filed"])
+        avg_response_days = round(metrics["avg_response_days"] or 0, 1)
+    else:
+        response_rate, avg_response_days = BASELINE_RESPONSE_RATE, BASELINE_RESPONSE_DAYS
     return {
         "success": True,
         "data": {
             "total_rtis": total,
             "filed": filed,
-            "response_rate": 72,
-            "avg_response_days": 18,
+            "response_rate": response_rate,
+            "avg_response_days": avg_response_days,
             "states_covered": 28,
             "departments_mapped": 500,
             "citizens_helped": total,
@@ -252,9 +473,16 @@ def get_analytics(db: Session = Depends(get_db)):
     }
 
 
+APPEAL_COLUMNS = (
+    RTIApplication.ref_number, RTIApplication.status, RTIApplication.filed_date,
+    RTIApplication.department, RTIApplication.subject, RTIApplication.applicant_name,
+    RTIApplication.applicant_address, RTIApplication.appeal_filed,
+)
+
+
 @app.post("/api/check-appeal")
-def check_appeal(req: CheckAppealRequest, db: Session = Depends(get_db)):
-    rti = db.query(RTIApplication).filter(RTIApplication.ref_number == req.ref_number).first()
+async def check_appeal(req: CheckAppealRequest, db: AsyncSession = Depends(get_db)):
+    rti = await find_rti(db, req.ref_number, *APPEAL_COLUMNS)
     if not rti:
         raise HTTPException(status_code=404, detail="RTI not found")
 
@@ -265,17 +493,29 @@ def check_appeal(req: CheckAppealRequest, db: Session = Depends(get_db)):
         "department": rti.department,
         "subject": rti.subject,
         "applicant_name": rti.applicant_name,
+        "applicant_address": rti.applicant_address,
         "appeal_filed": rti.appeal_filed
     }
 
-    result = appeal_agent.check_and_appeal(rti_dict)
+    result = get_appeal_agent().check_and_appeal(rti_dict)
     return {"success": True, "data": result}
 
 
+# The directory is static for the life of the process: serialise it once
+# and let clients revalidate with If-None-Match.
+DEPARTMENTS_BODY = orjson.dumps({"success": True, "data": PIO_DIRECTORY})
+DEPARTMENTS_ETAG = f'"{hashlib.md5(DEPARTMENTS_BODY).hexdigest()}"'
+DEPARTMENTS_HEADERS = {"ETag": DEPARTMENTS_ETAG, "Cache-Control": "public, max-age=3600"}
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match", "")
+    return header.strip() == "*" or etag in (t.strip() for t in header.split(","))
+
+
 @app.get("/api/departments")
-def get_departments():
-    from pathlib import Path
-    data_dir = Path(__file__).parent / "data"
-    with open(data_dir / "pio_directory.json") as f:
-        pios = json.load(f)
-    return {"success": True, "data": pios}
\ No newline at end of file
+def get_departments(request: Request):
+    if _etag_matches(request, DEPARTMENTS_ETAG):
+        return Response(status_code=304, headers=DEPARTMENTS_HEADERS)
+    return Response(content=DEPARTMENTS_BODY, media_type="application/json",
+                    headers=DEPARTMENTS_HEADERS)
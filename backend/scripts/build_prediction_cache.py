@@ -0,0 +1,60 @@
+"""
+build_prediction_cache.py — Regenerate data/prediction_cache.json
+Asks Gemini once per (category, jurisdiction, urgency) combination and writes
+the canonical predictions that AppealAgent.predict_success serves from memory.
+
+Run from backend/:  python -m scripts.build_prediction_cache
+"""
+import itertools
+import logging
+
+import orjson
+
+from agents._json_utils import loads_json
+from agents._llm_cache import cached_generate
+from agents._prediction_table import (CATEGORIES, JURISDICTIONS, TABLE_PATH,
+                                      URGENCIES, table_key)
+from agents._schemas import Prediction
+from agents.appeal_agent import PREDICTION_CONFIG, _prediction_context
+
+logger = logging.getLogger(__name__)
+
+
+def _synthetic_rti(category: str, jurisdiction: str, urgency: str):
+    topic = category.replace("_", " ")
+    query_analysis = {
+        "category": category,
+        "subject": f"Request for information regarding {topic}",
+        "urgency": urgency,
+        "extracted_info": {"specific_issue": f"Delay in a {topic} matter"},
+        "suggested_questions": [
+            f"Please provide the current status of the {topic} matter.",
+            "Please provide the names and designations of the officials responsible.",
+        ],
+    }
+    routing_info = {
+        "jurisdiction": jurisdiction,
+        "department": f"{jurisdiction.title()} {topic.title()} Department",
+    }
+    return query_analysis, routing_info
+
+
+def build() -> dict:
+    table = {}
+    for combo in itertools.product(CATEGORIES, JURISDICTIONS, URGENCIES):
+        prompt = _prediction_context(*_synthetic_rti(*combo))
+        raw = cached_generate(prompt, **PREDICTION_CONFIG)
+        table[table_key(*combo)] = Prediction.model_validate(loads_json(raw)).model_dump()
+        logger.info("%s done", table_key(*combo))
+    return table
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    table = build()
+    TABLE_PATH.write_bytes(orjson.dumps(table, option=orjson.OPT_INDENT_2 | orjson.OPT_SORT_KEYS))
+    logger.info("wrote %d predictions to %s", len(table), TABLE_PATH)
+
+
+if __name__ == "__main__":
+    main()
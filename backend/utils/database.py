@@ -2,21 +2,63 @@
 database.py — SQLite database setup and helper functions
 Uses SQLAlchemy for ORM with async support via aiosqlite
 """
+import logging
 import os
+from collections import Counter
 from datetime import datetime
-from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime, Boolean
+
+import orjson
+from sqlalchemy import (func, select, update, Column, Index, Integer, JSON, String,
+                        Text, DateTime, Boolean)
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import deferred
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+logger = logging.getLogger(__name__)
 
 # ── Load env ─────────────────────────────────────────────────
-DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./rti_saarthi.db")
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite+aiosqlite:///./rti_saarthi.db")
+
+# The engine is async, so plain sqlite:// and postgresql:// URLs from older
+# deployments are switched to their async drivers instead of failing.
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgres": "postgresql+asyncpg",
+    "postgresql": "postgresql+asyncpg",
+}
+_scheme, _sep, _rest = DATABASE_URL.partition("://")
+DATABASE_URL = ASYNC_DRIVERS.get(_scheme, _scheme) + _sep + _rest
 
 # ── SQLAlchemy Setup ─────────────────────────────────────────
-engine = create_engine(
+# Warm connections are reused, stale ones are replaced before a query hits
+# them, and bursts wait up to pool_timeout for a slot instead of failing.
+# In production put PgBouncer (port 6432) between this pool and Postgres.
+POOL_OPTIONS = {
+    "pool_size": int(os.getenv("DB_POOL_SIZE", 20)),
+    "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", 10)),
+    "pool_timeout": int(os.getenv("DB_POOL_TIMEOUT", 30)),
+    "pool_pre_ping": True,
+    "pool_recycle": 3600,
+}
+if DATABASE_URL.startswith("sqlite"):
+    if DATABASE_URL.rstrip("/").endswith((":memory:", "sqlite+aiosqlite:")):
+        # In-memory databases live on a single StaticPool connection.
+        POOL_OPTIONS = {}
+    else:
+        # aiosqlite defaults to NullPool, which reopens the file per session.
+        POOL_OPTIONS["poolclass"] = AsyncAdaptedQueuePool
+
+engine = create_async_engine(
     DATABASE_URL,
-    connect_args={"check_same_thread": False} if "sqlite" in DATABASE_URL else {}
+    json_serializer=lambda obj: orjson.dumps(obj).decode(),
+    json_deserializer=orjson.loads,
+    **POOL_OPTIONS
 )
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SessionLocal = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+# Dialect insert() with on_conflict_do_nothing(), for idempotent seeding.
+_insert = (postgresql if engine.dialect.name == "postgresql" else sqlite).insert
 Base = declarative_base()
 
 
@@ -35,14 +77,14 @@ class RTIApplication(Base):
     is_bpl          = Column(Boolean, default=False)
     bpl_card_no     = Column(String(30))
 
-    original_query  = Column(Text)
+    original_query  = deferred(Column(Text))   # not read by any endpoint
     language        = Column(String(20), default="en")
     department      = Column(String(200))
     pio_id          = Column(String(20))
     pio_name        = Column(String(100))
     pio_email       = Column(String(100))
     subject         = Column(String(500))
-    questions       = Column(Text)          # JSON list of formal questions
+    questions       = Column(JSON)          # list of formal questions
     draft_text      = Column(Text)          # Full RTI application text
 
     status          = Column(String(30), default="drafted")
@@ -51,7 +93,7 @@ class RTIApplication(Base):
 
     filed_date      = Column(DateTime)
     deadline_date   = Column(DateTime)
-    response_text   = Column(Text)
+    response_text   = deferred(Column(Text))
     response_date   = Column(DateTime)
     appeal_filed    = Column(Boolean, default=False)
     appeal_date     = Column(DateTime)
@@ -59,6 +101,10 @@ class RTIApplication(Base):
     created_at      = Column(DateTime, default=datetime.utcnow)
     updated_at      = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    __table_args__ = (
+        Index("ix_status_filed_date", "status", "filed_date"),
+    )
+
 
 class User(Base):
     """Simple user table for authentication."""
@@ -74,22 +120,129 @@ class User(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
 
 
-def init_db():
-    """Create all tables on startup."""
-    Base.metadata.create_all(bind=engine)
+class Stat(Base):
+    """Running counters for /api/analytics, maintained on write."""
+    __tablename__ = "stats"
+
+    key   = Column(String(50), primary_key=True)
+    value = Column(Integer, nullable=False, default=0)
+
+
+def _create_schema(conn):
+    Base.metadata.create_all(bind=conn)
+    # create_all skips indexes on tables that already exist
+    for index in RTIApplication.__table__.indexes:
+        index.create(bind=conn, checkfirst=True)
+
+
+async def init_db():
+    """Create all tables on startup and seed counters for existing data."""
+    async with engine.begin() as conn:
+        await conn.run_sync(_create_schema)
+    async with SessionLocal() as db:
+        if await db.scalar(select(Stat).limit(1)) is None:
+            # One GROUP BY over the (status, filed_date) index seeds every
+            # per-status counter plus the total.
+            by_status = await count_by_status(db)
+            counters = {"total_rtis": sum(by_status.values()), "filed": 0, **by_status}
+            # Workers started together all see an empty table; whichever
+            # inserts first wins and the rest skip instead of dying on the PK.
+            await db.execute(
+                _insert(Stat)
+                .values([{"key": k, "value": n} for k, n in counters.items()])
+                .on_conflict_do_nothing(index_elements=["key"])
+            )
+            await db.commit()
+    logger.info("database pool: %s", engine.pool.status())
+
+
+async def close_db():
+    """Close pooled connections on shutdown (aiosqlite keeps a thread per connection)."""
+    await engine.dispose()
 
 
-def get_db():
+async def get_db():
     """FastAPI dependency — yields a DB session."""
-    db = SessionLocal()
-    try:
+    async with SessionLocal() as db:
         yield db
-    finally:
-        db.close()
 
 
-def generate_ref_number(db) -> str:
-    """Generate a unique RTI reference number like RTI2024-00042."""
-    year = datetime.utcnow().year
-    count = db.query(RTIApplication).count() + 1
-    return f"RTI{year}-{count:05d}"
+async def count_by_status(db) -> dict:
+    """{status: row count}, counted in one pass over the status index."""
+    rows = await db.execute(
+        select(RTIApplication.status, func.count()).group_by(RTIApplication.status)
+    )
+    return dict(rows.all())
+
+
+def _days_between(start, end):
+    """SQL expression for end - start in (fractional) days."""
+    if engine.dialect.name == "sqlite":
+        return func.julianday(end) - func.julianday(start)
+    return func.extract("epoch", end - start) / 86400
+
+
+async def response_metrics(db) -> dict:
+    """
+    Filed count, responded count and mean days to response, aggregated in a
+    single SQL pass so the rows never reach Python. Responses are only
+    counted for filed rows, so responded <= filed and the average covers
+    the same rows.
+    """
+    row = (await db.execute(select(
+        func.count(RTIApplication.filed_date),
+        func.count(RTIApplication.response_date).filter(RTIApplication.filed_date.isnot(None)),
+        func.avg(_days_between(RTIApplication.filed_date, RTIApplication.response_date)),
+    ))).one()
+    return {"filed": row[0], "responded": row[1], "avg_response_days": row[2]}
+
+
+async def bump_stat(db, key: str, delta: int = 1):
+    """Increment a counter inside the caller's transaction (no commit)."""
+    result = await db.execute(
+        update(Stat).where(Stat.key == key).values(value=Stat.value + delta)
+    )
+    if not result.rowcount:
+        db.add(Stat(key=key, value=delta))
+
+
+async def get_stats(db) -> dict:
+    """All counters as a {key: value} dict."""
+    return dict((await db.execute(select(Stat.key, Stat.value))).all())
+
+
+async def find_rti(db, ref_number: str, *columns):
+    """
+    Point lookup on the unique ref_number index; None if not found. With
+    columns, only those are selected and a lightweight Row is returned
+    instead of a full RTIApplication.
+    """
+    where = RTIApplication.ref_number == ref_number
+    if columns:
+        return (await db.execute(select(*columns).where(where))).first()
+    return await db.scalar(select(RTIApplication).where(where))
+
+
+def _format_ref_number(year: int, n: int) -> str:
+    return f"RTI{year}-{n:05d}"
+
+
+async def save_applications(records: list) -> list:
+    """
+    Insert new applications in one transaction (one fsync for the batch),
+    numbering them RTI{year}-{id:05d} and bumping the counters as part of it.
+    Returns the ref numbers in input order.
+    """
+    async with SessionLocal() as db, db.begin():
+        # flush() assigns primary keys; numbering from the id is atomic and
+        # needs no COUNT(*) scan or lock across concurrent batches.
+        db.add_all(records)
+        await db.flush()
+        year = datetime.utcnow().year
+        refs = [_format_ref_number(year, record.id) for record in records]
+        for record, ref in zip(records, refs):
+            record.ref_number = ref
+        await bump_stat(db, "total_rtis", len(records))
+        for status, n in Counter(r.status for r in records).items():
+            await bump_stat(db, status, n)
+    return refs
@@ -2,7 +2,10 @@
 pdf_generator.py — Generates a formatted RTI application PDF
 Uses ReportLab library
 """
+import copy
 import io
+import os
+import tempfile
 from datetime import datetime
 from reportlab.lib.pagesizes import A4
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
@@ -13,8 +16,125 @@ from reportlab.platypus import (
 )
 from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_JUSTIFY
 
+# ── Styles ─────────────────────────────────────────────────
+# Nothing below depends on the application, so it is built once at import.
+BRAND_COLOR = colors.HexColor('#1a3c5e')
+_styles = getSampleStyleSheet()
 
-def generate_rti_pdf(rti_data: dict) -> bytes:
+TITLE_STYLE = ParagraphStyle(
+    'RTITitle',
+    parent=_styles['Heading1'],
+    fontSize=14,
+    textColor=BRAND_COLOR,
+    alignment=TA_CENTER,
+    spaceAfter=6
+)
+HEADING_STYLE = ParagraphStyle(
+    'RTIHeading',
+    parent=_styles['Heading2'],
+    fontSize=11,
+    textColor=BRAND_COLOR,
+    spaceAfter=4
+)
+BODY_STYLE = ParagraphStyle(
+    'RTIBody',
+    parent=_styles['Normal'],
+    fontSize=10,
+    leading=16,
+    alignment=TA_JUSTIFY,
+    spaceAfter=6
+)
+BOLD_STYLE = ParagraphStyle(
+    'RTIBold',
+    parent=BODY_STYLE,
+    fontName='Helvetica-Bold'
+)
+SMALL_STYLE = ParagraphStyle(
+    'RTISmall',
+    parent=_styles['Normal'],
+    fontSize=8,
+    textColor=colors.grey
+)
+BANNER_TITLE_STYLE = ParagraphStyle('h', parent=TITLE_STYLE, fontSize=16, textColor=colors.white)
+BANNER_SUBTITLE_STYLE = ParagraphStyle('s', parent=SMALL_STYLE, textColor=colors.lightgrey, alignment=TA_CENTER)
+
+HEADER_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, -1), BRAND_COLOR),
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+    ('ROWBACKGROUNDS', (0, 0), (-1, -1), [BRAND_COLOR]),
+    ('TOPPADDING', (0, 0), (-1, -1), 12),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 12),
+    ('ROUNDEDCORNERS', [5, 5, 5, 5]),
+])
+REF_TABLE_STYLE = TableStyle([
+    ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+    ('FONTNAME', (2, 0), (2, -1), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, -1), 10),
+    ('BACKGROUND', (0, 0), (-1, -1), colors.HexColor('#f0f7ff')),
+    ('GRID', (0, 0), (-1, -1), 0.5, colors.HexColor('#cce0f5')),
+    ('TOPPADDING', (0, 0), (-1, -1), 6),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
+])
+APPLICANT_TABLE_STYLE = TableStyle([
+    ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+    ('FONTNAME', (2, 0), (2, -1), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, -1), 9),
+    ('GRID', (0, 0), (-1, -1), 0.5, colors.HexColor('#e0e0e0')),
+    ('TOPPADDING', (0, 0), (-1, -1), 5),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 5),
+    ('SPAN', (1, 2), (3, 2)),
+])
+SIGNATURE_TABLE_STYLE = TableStyle([
+    ('FONTNAME', (0, 2), (0, 2), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, -1), 9),
+    ('ALIGN', (1, 0), (1, -1), 'RIGHT'),
+    ('TEXTCOLOR', (1, 3), (1, 4), colors.grey),
+])
+
+# ── Boilerplate ────────────────────────────────────────────
+TITLE_TEXT = "APPLICATION UNDER THE RIGHT TO INFORMATION ACT, 2005"
+REQUEST_TEXT = (
+    "I, the undersigned, hereby request the following information under Section 6(1) of the Right to Information Act, 2005:"
+)
+LEGAL_TEXT = (
+    "This request is made under Section 6(1) of the Right to Information Act, 2005. "
+    "As per Section 7(1) of the RTI Act, 2005, the requested information should be "
+    "provided within <b>30 days</b> of receipt of this application. "
+    "In case the information is not provided within the stipulated time, I reserve the "
+    "right to file a First Appeal under Section 19(1) of the RTI Act, 2005."
+)
+DECLARATION_TEXT = (
+    "I hereby declare that I am a citizen of India and the information sought does not "
+    "fall under any of the exemptions listed in Section 8 or Section 9 of the RTI Act, 2005."
+)
+BPL_EXEMPT_TEXT = "Yes (Exempt)"
+BPL_FEE_PAID_TEXT = "No (Fee Paid ₹10)"
+FOOTER_TEXT = "Generated by RTI-Saarthi | AI-Powered RTI Filing Agent | Democratizing Transparency"
+
+# The constant sections are parsed into flowables once. doc.build() stores
+# layout results on each flowable, so every PDF gets shallow copies: the
+# parsed markup is shared, the per-build state is not.
+LEGAL_FLOWABLES = (
+    Paragraph("LEGAL BASIS:", HEADING_STYLE),
+    Paragraph(LEGAL_TEXT, BODY_STYLE),
+    Spacer(1, 0.3*cm),
+    Paragraph(DECLARATION_TEXT, BODY_STYLE),
+    Spacer(1, 0.5*cm),
+    HRFlowable(width="100%", thickness=0.5, color=colors.grey),
+    Spacer(1, 0.3*cm),
+)
+FOOTER_FLOWABLES = (
+    HRFlowable(width="100%", thickness=0.5, color=BRAND_COLOR),
+    Paragraph(FOOTER_TEXT, SMALL_STYLE),
+)
+
+
+def _fresh(flowables) -> list:
+    return [copy.copy(f) for f in flowables]
+
+
+def generate_rti_pdf(rti_data: dict, output=None):
     """
     Generate a PDF for an RTI application.
     
@@ -23,11 +143,12 @@ def generate_rti_pdf(rti_data: dict) -> bytes:
             ref_number, applicant_name, applicant_address, applicant_mobile,
             applicant_email, is_bpl, bpl_card_no, department, pio_name,
             pio_address, subject, questions (list), draft_text, filed_date
+        output: optional binary file object to write the PDF into
     
     Returns:
-        bytes: PDF file content
+        bytes: PDF file content, or None when written to `output`
     """
-    buffer = io.BytesIO()
+    buffer = output if output is not None else io.BytesIO()
     doc = SimpleDocTemplate(
         buffer,
         pagesize=A4,
@@ -37,175 +158,104 @@ def generate_rti_pdf(rti_data: dict) -> bytes:
         bottomMargin=2*cm
     )
 
-    # ── Styles ─────────────────────────────────────────────
-    styles = getSampleStyleSheet()
-    
-    title_style = ParagraphStyle(
-        'RTITitle',
-        parent=styles['Heading1'],
-        fontSize=14,
-        textColor=colors.HexColor('#1a3c5e'),
-        alignment=TA_CENTER,
-        spaceAfter=6
-    )
-    heading_style = ParagraphStyle(
-        'RTIHeading',
-        parent=styles['Heading2'],
-        fontSize=11,
-        textColor=colors.HexColor('#1a3c5e'),
-        spaceAfter=4
-    )
-    body_style = ParagraphStyle(
-        'RTIBody',
-        parent=styles['Normal'],
-        fontSize=10,
-        leading=16,
-        alignment=TA_JUSTIFY,
-        spaceAfter=6
-    )
-    bold_style = ParagraphStyle(
-        'RTIBold',
-        parent=body_style,
-        fontName='Helvetica-Bold'
-    )
-    small_style = ParagraphStyle(
-        'RTISmall',
-        parent=styles['Normal'],
-        fontSize=8,
-        textColor=colors.grey
-    )
+    name = rti_data.get('applicant_name', '')
+    mobile = rti_data.get('applicant_mobile', '')
+    filed_date = rti_data.get('filed_date', '')
 
     story = []
 
     # ── Header Banner ────────────────────────────────────────
     header_data = [[
-        Paragraph("🇮🇳 RTI-SAARTHI", ParagraphStyle('h', parent=title_style, fontSize=16, textColor=colors.white)),
-        Paragraph("Right to Information Application", ParagraphStyle('s', parent=small_style, textColor=colors.lightgrey, alignment=TA_CENTER))
+        Paragraph("🇮🇳 RTI-SAARTHI", BANNER_TITLE_STYLE),
+        Paragraph("Right to Information Application", BANNER_SUBTITLE_STYLE)
     ]]
     header_table = Table(header_data, colWidths=[17*cm])
-    header_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, -1), colors.HexColor('#1a3c5e')),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-        ('ROWBACKGROUNDS', (0, 0), (-1, -1), [colors.HexColor('#1a3c5e')]),
-        ('TOPPADDING', (0, 0), (-1, -1), 12),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 12),
-        ('ROUNDEDCORNERS', [5, 5, 5, 5]),
-    ]))
+    header_table.setStyle(HEADER_TABLE_STYLE)
     story.append(header_table)
     story.append(Spacer(1, 0.4*cm))
 
     # ── Ref Number + Date ─────────────────────────────────────
     ref_data = [
         ["Reference Number:", rti_data.get('ref_number', 'N/A'),
-         "Date:", rti_data.get('filed_date', datetime.now().strftime('%d/%m/%Y'))]
+         "Date:", filed_date if 'filed_date' in rti_data else datetime.now().strftime('%d/%m/%Y')]
     ]
     ref_table = Table(ref_data, colWidths=[4*cm, 5*cm, 2*cm, 6*cm])
-    ref_table.setStyle(TableStyle([
-        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-        ('FONTNAME', (2, 0), (2, -1), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ('BACKGROUND', (0, 0), (-1, -1), colors.HexColor('#f0f7ff')),
-        ('GRID', (0, 0), (-1, -1), 0.5, colors.HexColor('#cce0f5')),
-        ('TOPPADDING', (0, 0), (-1, -1), 6),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-    ]))
+    ref_table.setStyle(REF_TABLE_STYLE)
     story.append(ref_table)
     story.append(Spacer(1, 0.4*cm))
 
     # ── Main Title ────────────────────────────────────────────
-    story.append(Paragraph("APPLICATION UNDER THE RIGHT TO INFORMATION ACT, 2005", title_style))
-    story.append(HRFlowable(width="100%", thickness=2, color=colors.HexColor('#1a3c5e')))
+    story.append(Paragraph(TITLE_TEXT, TITLE_STYLE))
+    story.append(HRFlowable(width="100%", thickness=2, color=BRAND_COLOR))
     story.append(Spacer(1, 0.4*cm))
 
     # ── TO Address ───────────────────────────────────────────
-    story.append(Paragraph("TO:", heading_style))
-    story.append(Paragraph(f"The Public Information Officer,", body_style))
-    story.append(Paragraph(f"<b>{rti_data.get('department', '')}</b>,", body_style))
-    story.append(Paragraph(f"{rti_data.get('pio_address', 'India')}", body_style))
+    story.append(Paragraph("TO:", HEADING_STYLE))
+    story.append(Paragraph(f"The Public Information Officer,", BODY_STYLE))
+    story.append(Paragraph(f"<b>{rti_data.get('department', '')}</b>,", BODY_STYLE))
+    story.append(Paragraph(f"{rti_data.get('pio_address', 'India')}", BODY_STYLE))
     story.append(Spacer(1, 0.3*cm))
 
     # ── Applicant Details ─────────────────────────────────────
-    story.append(Paragraph("APPLICANT DETAILS:", heading_style))
+    story.append(Paragraph("APPLICANT DETAILS:", HEADING_STYLE))
     appl_data = [
-        ["Name:", rti_data.get('applicant_name', ''), "Mobile:", rti_data.get('applicant_mobile', '')],
-        ["Email:", rti_data.get('applicant_email', ''), "BPL Status:", "Yes (Exempt)" if rti_data.get('is_bpl') else "No (Fee Paid ₹10)"],
+        ["Name:", name, "Mobile:", mobile],
+        ["Email:", rti_data.get('applicant_email', ''), "BPL Status:", BPL_EXEMPT_TEXT if rti_data.get('is_bpl') else BPL_FEE_PAID_TEXT],
         ["Address:", rti_data.get('applicant_address', ''), "", ""],
     ]
     appl_table = Table(appl_data, colWidths=[3*cm, 6.5*cm, 3*cm, 4.5*cm])
-    appl_table.setStyle(TableStyle([
-        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-        ('FONTNAME', (2, 0), (2, -1), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, -1), 9),
-        ('GRID', (0, 0), (-1, -1), 0.5, colors.HexColor('#e0e0e0')),
-        ('TOPPADDING', (0, 0), (-1, -1), 5),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 5),
-        ('SPAN', (1, 2), (3, 2)),
-    ]))
+    appl_table.setStyle(APPLICANT_TABLE_STYLE)
     story.append(appl_table)
     story.append(Spacer(1, 0.4*cm))
 
     # ── Subject ───────────────────────────────────────────────
-    story.append(Paragraph(f"<b>Subject:</b> {rti_data.get('subject', 'Request for Information under RTI Act 2005')}", body_style))
+    story.append(Paragraph(f"<b>Subject:</b> {rti_data.get('subject', 'Request for Information under RTI Act 2005')}", BODY_STYLE))
     story.append(Spacer(1, 0.3*cm))
 
     # ── Info Requested ────────────────────────────────────────
-    story.append(Paragraph("INFORMATION SOUGHT:", heading_style))
-    story.append(Paragraph(
-        "I, the undersigned, hereby request the following information under Section 6(1) of the Right to Information Act, 2005:",
-        body_style
-    ))
+    story.append(Paragraph("INFORMATION SOUGHT:", HEADING_STYLE))
+    story.append(Paragraph(REQUEST_TEXT, BODY_STYLE))
     story.append(Spacer(1, 0.2*cm))
 
     questions = rti_data.get('questions', [])
     for i, q in enumerate(questions, 1):
-        story.append(Paragraph(f"<b>{i}.</b> {q}", body_style))
+        story.append(Paragraph(f"<b>{i}.</b> {q}", BODY_STYLE))
     story.append(Spacer(1, 0.4*cm))
 
-    # ── Legal Provisions ──────────────────────────────────────
-    story.append(Paragraph("LEGAL BASIS:", heading_style))
-    legal_text = (
-        "This request is made under Section 6(1) of the Right to Information Act, 2005. "
-        "As per Section 7(1) of the RTI Act, 2005, the requested information should be "
-        "provided within <b>30 days</b> of receipt of this application. "
-        "In case the information is not provided within the stipulated time, I reserve the "
-        "right to file a First Appeal under Section 19(1) of the RTI Act, 2005."
-    )
-    story.append(Paragraph(legal_text, body_style))
-    story.append(Spacer(1, 0.3*cm))
-
-    # ── Declaration ───────────────────────────────────────────
-    story.append(Paragraph(
-        "I hereby declare that I am a citizen of India and the information sought does not "
-        "fall under any of the exemptions listed in Section 8 or Section 9 of the RTI Act, 2005.",
-        body_style
-    ))
-    story.append(Spacer(1, 0.5*cm))
+    # ── Legal Provisions + Declaration ────────────────────────
+    story.extend(_fresh(LEGAL_FLOWABLES))
 
     # ── Signature Block ───────────────────────────────────────
-    story.append(HRFlowable(width="100%", thickness=0.5, color=colors.grey))
-    story.append(Spacer(1, 0.3*cm))
     sig_data = [
         ["Yours faithfully,", ""],
         ["", ""],
-        [f"<b>{rti_data.get('applicant_name', '')}</b>", f"Deadline: {rti_data.get('deadline_date', '')}"],
-        [f"Date: {rti_data.get('filed_date', '')}", f"Filed via: RTI-Saarthi Platform"],
-        [f"Mobile: {rti_data.get('applicant_mobile', '')}", "rtisaarthi.in"],
+        [f"<b>{name}</b>", f"Deadline: {rti_data.get('deadline_date', '')}"],
+        [f"Date: {filed_date}", f"Filed via: RTI-Saarthi Platform"],
+        [f"Mobile: {mobile}", "rtisaarthi.in"],
     ]
     sig_table = Table(sig_data, colWidths=[9*cm, 8*cm])
-    sig_table.setStyle(TableStyle([
-        ('FONTNAME', (0, 2), (0, 2), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, -1), 9),
-        ('ALIGN', (1, 0), (1, -1), 'RIGHT'),
-        ('TEXTCOLOR', (1, 3), (1, 4), colors.grey),
-    ]))
+    sig_table.setStyle(SIGNATURE_TABLE_STYLE)
     story.append(sig_table)
     story.append(Spacer(1, 0.3*cm))
 
     # ── Footer ────────────────────────────────────────────────
-    footer_text = "Generated by RTI-Saarthi | AI-Powered RTI Filing Agent | Democratizing Transparency"
-    story.append(HRFlowable(width="100%", thickness=0.5, color=colors.HexColor('#1a3c5e')))
-    story.append(Paragraph(footer_text, small_style))
+    story.extend(_fresh(FOOTER_FLOWABLES))
 
     doc.build(story)
-    return buffer.getvalue()
\ No newline at end of file
+    if output is None:
+        return buffer.getvalue()
+
+
+def write_rti_pdf(rti_data: dict, path: str):
+    """
+    Render into a temp file beside `path` and move it into place atomically,
+    so a concurrent reader never sees a half-written PDF. Module-level and
+    free of app imports so it can run in a worker process.
+    """
+    with tempfile.NamedTemporaryFile(dir=os.path.dirname(path), suffix=".tmp", delete=False) as tmp:
+        try:
+            generate_rti_pdf(rti_data, tmp)
+        except Exception:
+            os.unlink(tmp.name)
+            raise
+    os.replace(tmp.name, path)